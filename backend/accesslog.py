@@ -0,0 +1,171 @@
+"""Structured access logs written off the request thread
+
+Each logged request becomes one JSON object per line. Request threads only
+build the record and put it on a bounded in-memory queue; a writer thread
+per process (logging's QueueListener) formats and writes it, so a slow disk
+or pipe never delays an answer. When the queue is full the record is
+dropped and counted rather than waited for.
+
+Successful requests are sampled at sample_rate; errors, exceptions and
+requests slower than slow_seconds are always logged. The destination is
+"-" for standard output or a file path, rotated by size (max_bytes,
+backups) or, with when set ("midnight", "h", ...), by time. "{pid}" in
+the path gives every gunicorn worker its own file, since each process
+rotates the file it writes.
+"""
+from datetime import datetime, timezone
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+
+# Keep an odd client value from bloating a line
+MAX_FIELD_LENGTH = 64
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, message and the access fields"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'message': record.getMessage(),
+            'pid': record.process,
+        }
+        entry.update(getattr(record, 'access', ()))
+        if record.exc_text:
+            entry['traceback'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """A QueueHandler that never blocks and defers formatting to the writer"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # The record only holds plain values; a traceback has to be rendered
+        # now, while the frames still exist
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class FlushingQueueListener(logging.handlers.QueueListener):
+    """Waits for room for its stop marker, so stopping with a full queue drains it"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class AccessLog:
+    """Sample, queue and write one structured line per request"""
+
+    def __init__(self, path='-', sample_rate=1.0, slow_seconds=0.5, max_bytes=10 * 1024 * 1024, backups=5,
+                 when='', queue_size=10000, name='portfolio_chat.access'):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.when = when
+        self.queue_size = queue_size
+        self.logged = 0
+        self._handler = DroppingQueueHandler(queue.Queue(queue_size))
+        self._listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(name)
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.logger.addHandler(self._handler)
+        atexit.register(self.stop)
+
+    def _writer(self):
+        if self.path == '-':
+            handler = logging.StreamHandler(sys.stdout)
+        else:
+            path = self.path.format(pid=os.getpid())
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            if self.when:
+                handler = logging.handlers.TimedRotatingFileHandler(
+                    path, when=self.when, backupCount=self.backups, encoding='utf-8', delay=True, utc=True
+                )
+            else:
+                handler = logging.handlers.RotatingFileHandler(
+                    path, maxBytes=self.max_bytes, backupCount=self.backups, encoding='utf-8', delay=True
+                )
+        handler.setFormatter(JsonFormatter())
+        return handler
+
+    def ensure_started(self):
+        """Start this process's writer thread; the parent's did not survive a fork"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # A fresh queue too: records queued before the fork belong to the parent
+            self._handler.queue = queue.Queue(self.queue_size)
+            self._listener = FlushingQueueListener(self._handler.queue, self._writer())
+            self._listener.start()
+            # Set last, so no other thread skips ahead before the writer runs
+            self._pid = os.getpid()
+
+    def stop(self):
+        """Write whatever is still queued and close the file"""
+        listener = self._listener
+        if listener is not None and self._pid == os.getpid():
+            self._listener = None
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+
+    def wants(self, status, seconds, failed=False):
+        """Whether to log a request: always when it failed or was slow, else sampled"""
+        if failed or status >= 500 or seconds >= self.slow_seconds:
+            return True
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def request(self, method, path, status, seconds, error=None, **fields):
+        """Queue one request; fields with a None value are left out"""
+        self.ensure_started()
+        access = {'method': method, 'path': path, 'status': status, 'ms': round(seconds * 1000, 3)}
+        for key, value in fields.items():
+            if value is not None:
+                access[key] = value if isinstance(value, (bool, int, float)) else str(value)[:MAX_FIELD_LENGTH]
+        if error is not None:
+            access['error'] = type(error).__name__
+        self.logged += 1
+        # makeRecord instead of log(): the caller's file and line are not
+        # needed, and looking them up walks the stack on every request
+        self.logger.handle(self.logger.makeRecord(
+            self.logger.name, logging.ERROR if error is not None or status >= 500 else logging.INFO,
+            '', 0, 'request', (), (type(error), error, error.__traceback__) if error is not None else None,
+            extra={'access': access},
+        ))
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'sampleRate': self.sample_rate,
+            'logged': self.logged,
+            'queued': self._handler.queue.qsize(),
+            'dropped': self._handler.dropped,
+        }
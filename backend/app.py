@@ -1,1229 +1,666 @@
-from flask import Flask, request, jsonify
+from flask import Flask, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-from functools import wraps
-from datetime import datetime, timedelta
-import re
-import html
+from functools import partial, wraps
+from itertools import islice
+from time import perf_counter
+import os
+import tempfile
+import threading
+
+from accesslog import AccessLog
+from cache import AnswerCache
+from fuzzy import FuzzyMatcher, SymSpellIndex
+from guard import MAX_MESSAGE_LENGTH, guard_message
+from jsonstream import iter_json_array
+from knowledge import KnowledgeBases, KnowledgeBaseStore, language_path
+from language import DEFAULT_LANGUAGE, SUPPORTED_LANGUAGES, ChineseSegmenter, LanguageDetector, resolve_language
+from limiter import MemoryRateLimiter, RedisRateLimiter, SharedMemoryRateLimiter
+from matcher import FallbackMatcher, KeywordMatcher, TokenIndexMatcher
+from metrics import MetricsRegistry
+from misses import MissLog
+from responses import MIN_DYNAMIC_SIZE, accepted_encodings, compile_responses, compress, etag_matches
+from sessions import SessionStore, is_follow_up, valid_session_id
 
 app = Flask(__name__)
 CORS(app)
 
-# Rate limiting storage (in production, use Redis)
-rate_limit_store = {}
-MAX_REQUESTS = 10
-TIME_WINDOW = 60  # seconds
+# Rate limiting
+MAX_REQUESTS = int(os.environ.get('RATE_LIMIT_MAX_REQUESTS', '10'))
+TIME_WINDOW = int(os.environ.get('RATE_LIMIT_WINDOW', '60'))  # seconds
+RATE_LIMIT_MAX_ENTRIES = int(os.environ.get('RATE_LIMIT_MAX_ENTRIES', '10000'))
+
+# "memory" counts per worker, "shm" shares one table between all workers on
+# the host and "redis" shares counters between hosts
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+RATE_LIMIT_SHM_PATH = os.environ.get(
+    'RATE_LIMIT_SHM_PATH',
+    os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'portfolio-chat-ratelimit')
+)
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+RATE_LIMIT_REDIS_TIMEOUT = float(os.environ.get('RATE_LIMIT_REDIS_TIMEOUT', '0.05'))  # seconds
+
+def create_rate_limiter():
+    """Build the rate-limit backend selected by RATE_LIMIT_BACKEND"""
+    local = MemoryRateLimiter(MAX_REQUESTS, TIME_WINDOW, RATE_LIMIT_MAX_ENTRIES)
+    if RATE_LIMIT_BACKEND == 'shm':
+        return SharedMemoryRateLimiter(RATE_LIMIT_SHM_PATH, MAX_REQUESTS, TIME_WINDOW, RATE_LIMIT_MAX_ENTRIES)
+    if RATE_LIMIT_BACKEND == 'redis':
+        return RedisRateLimiter(REDIS_URL, MAX_REQUESTS, TIME_WINDOW, RATE_LIMIT_REDIS_TIMEOUT, fallback=local)
+    return local
+
+rate_limiter = create_rate_limiter()
+
+# Metrics for /api/metrics. With METRICS_DIR set, every gunicorn worker
+# records into its own file there and a scrape sums all of them.
+METRICS_DIR = os.environ.get('METRICS_DIR')
+STAGE_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1)
+REQUEST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+metrics = MetricsRegistry(METRICS_DIR)
+stage_seconds = metrics.histogram('chat_stage_seconds', 'Time spent in each stage of answering a message', STAGE_BUCKETS, ('stage',))
+request_seconds = metrics.histogram('chat_request_seconds', 'Request latency by endpoint', REQUEST_BUCKETS, ('endpoint',))
+responses_total = metrics.counter('chat_responses', 'Responses by endpoint and status code', ('endpoint', 'status'))
+matched_total = metrics.counter('chat_matched', 'Answers by matched category', ('category',))
+default_fallbacks_total = metrics.counter('chat_default_fallback', 'Messages answered with the default response')
+compression_saved_total = metrics.counter(
+    'chat_compression_saved_bytes', 'Response bytes saved by compression, precomputed or per request', ('encoding', 'source')
+)
+# The shm table is shared, so every worker sees the same size
+rate_limit_entries = metrics.gauge(
+    'chat_rate_limit_entries', 'Clients tracked by the rate limiter',
+    mode='max' if RATE_LIMIT_BACKEND == 'shm' else 'livesum'
+)
+
+# One JSON line per request, written by a background thread: "-" is
+# standard output, "" turns logging off. Successful requests are sampled;
+# errors and requests slower than ACCESS_LOG_SLOW_MS are always logged.
+ACCESS_LOG = os.environ.get('ACCESS_LOG', '-')
+ACCESS_LOG_SAMPLE_RATE = float(os.environ.get('ACCESS_LOG_SAMPLE_RATE', '1'))
+ACCESS_LOG_SLOW_MS = float(os.environ.get('ACCESS_LOG_SLOW_MS', '500'))
+ACCESS_LOG_MAX_BYTES = int(os.environ.get('ACCESS_LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+ACCESS_LOG_BACKUPS = int(os.environ.get('ACCESS_LOG_BACKUPS', '5'))
+ACCESS_LOG_ROTATE_WHEN = os.environ.get('ACCESS_LOG_ROTATE_WHEN', '')  # e.g. "midnight"; size-based if empty
+
+access_log = None
+if ACCESS_LOG:
+    access_log = AccessLog(ACCESS_LOG, ACCESS_LOG_SAMPLE_RATE, ACCESS_LOG_SLOW_MS / 1000,
+                           ACCESS_LOG_MAX_BYTES, ACCESS_LOG_BACKUPS, ACCESS_LOG_ROTATE_WHEN)
 
 def rate_limit(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        client_ip = request.remote_addr
-        now = datetime.now()
-        
-        if client_ip in rate_limit_store:
-            requests, first_request = rate_limit_store[client_ip]
-            if now - first_request < timedelta(seconds=TIME_WINDOW):
-                if requests >= MAX_REQUESTS:
-                    return jsonify({'response': 'Too many requests. Please wait a moment.'}), 429
-                rate_limit_store[client_ip] = (requests + 1, first_request)
-            else:
-                rate_limit_store[client_ip] = (1, now)
-        else:
-            rate_limit_store[client_ip] = (1, now)
+        allowed = rate_limiter.hit(request.remote_addr)
+        g.rate_limit = 'allowed' if allowed else 'limited'
+        if rate_limiter.name == 'memory':
+            rate_limit_entries.set(len(rate_limiter))
+        if not allowed:
+            return jsonify({'response': 'Too many requests. Please wait a moment.'}), 429
         
         return f(*args, **kwargs)
     return decorated_function
 
-def sanitize_input(text):
-    """Sanitize user input to prevent XSS and injection attacks"""
-    if not text:
-        return ""
-    
-    # Remove potentially dangerous characters
-    text = html.escape(text)
-    
-    # Remove script tags and event handlers
-    text = re.sub(r'<script[^>]*>.*?</script>', '', text, flags=re.IGNORECASE | re.DOTALL)
-    text = re.sub(r'on\w+\s*=', '', text, flags=re.IGNORECASE)
-    
-    # Limit length
-    if len(text) > 500:
-        text = text[:500]
-    
-    return text.strip()
-
-def validate_input(text):
-    """Validate input format"""
-    if not text or not isinstance(text, str):
-        return False
-    
-    # Check for SQL injection patterns
-    sql_patterns = [
-        r'(\b(SELECT|INSERT|UPDATE|DELETE|DROP|CREATE|ALTER|EXEC|EXECUTE)\b)',
-        r'(\b(UNION|OR|AND)\s+\d+\s*=\s*\d+)',
-        r'(\'|\"|;|--|\/\*|\*\/)'
-    ]
-    
-    for pattern in sql_patterns:
-        if re.search(pattern, text, re.IGNORECASE):
-            return False
-    
-    # Check for XSS patterns
-    xss_patterns = [
-        r'<script',
-        r'javascript:',
-        r'onerror=',
-        r'onload=',
-        r'<iframe',
-        r'<object',
-        r'<embed'
-    ]
-    
-    for pattern in xss_patterns:
-        if re.search(pattern, text, re.IGNORECASE):
-            return False
-    
-    return True
-
-# Pre-defined Q&A pairs
-qa_pairs = {
-    # Who is Gabriel - Short intro with link
-    "who_is_gabriel": {
-        "keywords": ["who", "gabriel", "introduce", "about gabriel", "tell me about", "sino si gabriel", "sino ka", "who are you", "introduce yourself", "tell me about yourself", "what do you do", "what is your name", "name", "background", "bio", "biography"],
-        "response": """Gabriel Paras Abiog is a passionate **AI Developer and Data Analyst** currently completing his Bachelor of Science in Computer Science at FEU Institute of Technology. 
-
-He specializes in building intelligent systems, analyzing complex datasets, and delivering high-quality software solutions. With 4+ years of combined experience, he has successfully completed 15+ projects and holds 8 industry certifications.
-
-**Key Highlights:**
-• 15+ Projects Completed
-• 8 Certifications
-• 95%+ Test Coverage Excellence
-• 4 AI/ML Projects
-
-<a href="#about" class="chatbot-link">📖 Click here to view more about Gabriel</a>"""
-    },
-    
-    # Experience questions
-    "experience": {
-        "keywords": ["experience", "worked", "work", "job", "position", "role", "intern", "developer", "employment", "work history", "career", "professional experience", "employment history", "work experience", "previous job", "current job", "where do you work", "where have you worked", "companies", "employer"],
-        "response": """Gabriel has diverse experience in AI development and software engineering:
-
-**Current Role:**
-• AI Developer Intern (Fullstack) at FEU Institute of Technology
-• Improved chatbot accuracy by 15%, reduced API response time by 40%
-
-**Previous Roles:**
-• AI Developer and Data Analyst - Deployed 5+ ML models, processed 100K+ data points
-• Web Developer - Achieved 100% cross-browser compatibility
-• Customer Service Representative - 95%+ satisfaction rate, zero compliance violations
-
-<a href="#experience" class="chatbot-link">💼 Click here to view detailed experience</a>"""
-    },
-    
-    # Projects questions
-    "projects": {
-        "keywords": ["project", "projects", "built", "developed", "created", "work", "portfolio", "application", "app", "applications", "what have you built", "what did you build", "show me projects", "your projects", "portfolio projects", "github", "code", "programming projects", "software projects", "what projects", "examples", "demos"],
-        "response": """Gabriel has worked on 15+ exciting AI and software projects:
-
-**Featured Projects:**
-• **TALA: AI-Powered Calendar Assistant** - 95%+ test coverage, 80% conflict reduction
-• **FEU Tech AI Chatbot** - 98%+ accuracy, 68% response time improvement
-• **AI Skill Assessment** - 100% scoring accuracy, 5000+ assessments processed
-• **AI Tutor** - 92% satisfaction rate, 35% improved learning outcomes
-
-All projects feature comprehensive testing, modern tech stacks, and measurable results.
-
-<a href="#projects" class="chatbot-link">🚀 Click here to view all projects with details</a>"""
-    },
-    
-    # Technology questions
-    "technologies": {
-        "keywords": ["technology", "technologies", "tech", "skills", "programming", "languages", "tools", "stack", "framework", "what tech", "what tools"],
-        "response": """Gabriel works with a comprehensive tech stack:
-
-**Programming:** Python, JavaScript, Java, C++
-**Frontend:** React.js, HTML, CSS
-**Backend:** Node.js, Express.js, REST APIs
-**Databases:** MongoDB
-**Testing:** Postman, PyTest, JUnit, Selenium (95%+ coverage)
-**AI/ML:** GPT-4, LangChain, OpenAI API, ML/DL
-**Cloud:** AWS, Linux
-**Security:** Kali Linux
-
-He has 10+ technologies mastered with strong proficiency across the full stack.
-
-<a href="#skills" class="chatbot-link">🛠️ Click here to view all skills and proficiency levels</a>"""
-    },
-    
-    # Contact questions
-    "contact": {
-        "keywords": ["contact", "email", "reach", "get in touch", "hire", "available", "connect", "how to contact", "email address", "phone"],
-        "response": """You can reach Gabriel through:
-
-📧 **Email:** gabrielparasabiog@gmail.com
-🌐 **Website:** www.reallygreatsite.com
-📍 **Location:** 117 Patnuaby St. Brgy San Agustin Q.C
-
-He's always open to discussing new opportunities, interesting projects, or collaborations!
-
-<a href="#contact" class="chatbot-link">📞 Click here for contact information</a>"""
-    },
-    
-    # Certifications questions
-    "certifications": {
-        "keywords": ["certification", "certifications", "certified", "certificate", "credentials", "qualifications", "cert"],
-        "response": """Gabriel holds 8 industry-recognized certifications:
-
-**Cisco:** DevNet Associate, CCNA Introduction to Networks
-**IT Specialist:** Python, Java
-**Google (2025):** Job Search with AI, Art of Prompting, Introduction to AI
-**Coursera:** Google Project Management Professional Certificate
-
-These certifications demonstrate his commitment to continuous learning and professional development.
-
-<a href="#education" class="chatbot-link">🎓 Click here to view all certifications and education</a>"""
-    },
-    
-    # Education questions
-    "education": {
-        "keywords": ["education", "degree", "university", "college", "school", "studied", "graduate", "student", "academic"],
-        "response": """Gabriel is currently completing his **Bachelor of Science in Computer Science** at FEU Institute of Technology.
-
-**Relevant Coursework:**
-• Software Quality Assurance
-• Software Engineering
-• Database Management
-• Artificial Intelligence
-• Networking Fundamentals
-
-He's also an active organizer of tech events like CS Expo 2024 and has participated in multiple tech conferences.
-
-<a href="#education" class="chatbot-link">🎓 Click here to view full education and activities</a>"""
-    },
-    
-    # Skills questions
-    "skills": {
-        "keywords": ["skill", "skills", "expertise", "proficient", "good at", "specialize", "what can", "capabilities"],
-        "response": """Gabriel has a comprehensive skill set:
-
-**Professional Skills:**
-Testing (95%+ coverage), Automation, Scripting, Problem-solving, Communication, Debugging, Documentation, Optimization, Organization, Analysis, Design, Integration, Collaboration, Troubleshooting, Deployment
-
-**Technical Skills:**
-Strong proficiency in Python (90%), JavaScript (85%), Node.js (85%), React.js (80%), REST APIs (85%), Postman (90%), PyTest (90%), Selenium (85%), MongoDB (80%), and more.
-
-He specializes in AI development, data analysis, and quality assurance!
-
-<a href="#skills" class="chatbot-link">💪 Click here to view all skills with proficiency levels</a>"""
-    },
-    
-    # Achievements and Stats
-    "achievements": {
-        "keywords": ["achievement", "achievements", "accomplishment", "stats", "statistics", "metrics", "results", "success"],
-        "response": """Gabriel has impressive achievements:
-
-**Key Metrics:**
-• 15+ Projects Completed
-• 10+ Technologies Mastered
-• 5+ Team Collaborations
-• 8 Certifications
-• 95%+ Test Coverage
-• 4 AI Projects
-
-**Notable Results:**
-• Improved chatbot accuracy by 15%
-• Reduced API response time by 40-68%
-• Processed 100,000+ data points
-• Achieved 98%+ response accuracy
-• Zero compliance violations
-
-<a href="#stats" class="chatbot-link">📊 Click here to view all achievements and metrics</a>"""
-    },
-    
-    # Experience Duration
-    "experience_years": {
-        "keywords": ["how long", "years of experience", "experience years", "how many years", "duration"],
-        "response": """Gabriel has 4+ years of combined professional experience:
-
-• **2 years** - Customer Service Representative (Teleperformance)
-• **3 months** - AI Developer Intern (FEU Institute of Technology)
-• **Current** - AI Developer and Data Analyst (FEU Institute of Technology)
-• **2024** - Web Developer (IEMELIF Church Website)
-
-Plus extensive project experience with 15+ completed projects.
-
-<a href="#experience" class="chatbot-link">💼 Click here to view detailed experience</a>"""
-    },
-    
-    # AI Projects
-    "ai_projects": {
-        "keywords": ["ai project", "ai projects", "machine learning", "ml project", "deep learning", "dl project", "chatbot", "ai chatbot"],
-        "response": """Gabriel has worked on 4 major AI projects:
-
-1. **FEU Tech AI Chatbot** - GPT-4 powered, 98%+ accuracy, 68% faster response time
-2. **AI Skill Assessment** - Automated evaluation system, 100% scoring accuracy
-3. **AI Tutor** - Personalized learning, 92% satisfaction, 35% improved outcomes
-4. **TALA Calendar Assistant** - AI-powered scheduling, 80% conflict reduction
-
-All projects use cutting-edge AI/ML technologies like GPT-4, LangChain, and custom ML models.
-
-<a href="#projects" class="chatbot-link">🤖 Click here to view all AI projects</a>"""
-    },
-    
-    # Testing and QA
-    "testing_qa": {
-        "keywords": ["testing", "qa", "quality assurance", "test coverage", "automated testing", "manual testing", "selenium", "pytest"],
-        "response": """Gabriel is highly skilled in Quality Assurance:
-
-**Testing Expertise:**
-• 95%+ Test Coverage across all projects
-• Automated testing with Selenium, PyTest, JUnit
-• API testing with Postman
-• Manual and integration testing
-• Bug tracking and documentation
-
-**Achievements:**
-• Created 500+ unit and integration tests
-• Identified and resolved 50+ critical bugs
-• Reduced manual testing time by 60%
-• Achieved 100% cross-browser compatibility
-
-<a href="#skills" class="chatbot-link">🧪 Click here to view testing skills</a>"""
-    },
-    
-    # Location
-    "location": {
-        "keywords": ["where", "location", "address", "live", "based", "from", "residence"],
-        "response": """Gabriel is based in:
-
-📍 **Address:** 117 Patnuaby St. Brgy San Agustin, Quezon City, Philippines
-
-He's available for remote work and local opportunities in the Metro Manila area.
-
-<a href="#contact" class="chatbot-link">📍 Click here for full contact information</a>"""
-    },
-    
-    # Availability
-    "availability": {
-        "keywords": ["available", "hire", "hiring", "job", "opportunity", "open to work", "looking for", "recruiting"],
-        "response": """Gabriel is open to new opportunities!
-
-**Available For:**
-• Full-time positions
-• Part-time projects
-• Freelance work
-• Internships
-• Collaborations
-
-**Interested In:**
-• AI/ML Development roles
-• Data Analyst positions
-• Full-stack development
-• Quality Assurance roles
-
-He's always excited to discuss interesting projects and opportunities!
-
-<a href="#contact" class="chatbot-link">💼 Click here to get in touch</a>"""
-    },
-    
-    # Portfolio
-    "portfolio": {
-        "keywords": ["portfolio", "website", "show me", "work samples", "examples", "demo"],
-        "response": """You're currently viewing Gabriel's portfolio! 
-
-This website showcases:
-• Professional experience and achievements
-• 15+ completed projects with details
-• Technical skills and certifications
-• Education and activities
-• Contact information
-
-Explore the sections above to learn more about his work and accomplishments.
-
-<a href="#projects" class="chatbot-link">🚀 Click here to view projects</a>"""
-    },
-    
-    # Python
-    "python": {
-        "keywords": ["python", "python programming", "python developer"],
-        "response": """Gabriel is highly proficient in Python (90% proficiency):
-
-**Python Expertise:**
-• AI/ML development with Python
-• Data analysis and processing
-• Backend API development
-• Automated testing with PyTest
-• Scripting and automation
-
-**Projects using Python:**
-• TALA Calendar Assistant
-• FEU Tech AI Chatbot
-• AI Skill Assessment
-• AI Tutor
-• Data analysis pipelines
-
-<a href="#skills" class="chatbot-link">🐍 Click here to view all Python skills</a>"""
-    },
-    
-    # React
-    "react": {
-        "keywords": ["react", "react.js", "react developer", "frontend", "reactjs", "react framework"],
-        "response": """Gabriel has strong React.js skills (80% proficiency):
-
-**React Expertise:**
-• Component-based development
-• State management
-• API integration
-• Responsive UI design
-• Modern React hooks
-
-**Projects using React:**
-• FEU Tech AI Chatbot (React.js frontend)
-• AI Tutor (React.js interface)
-• This portfolio website!
-
-<a href="#projects" class="chatbot-link">⚛️ Click here to view React projects</a>"""
-    },
-    
-    # JavaScript
-    "javascript": {
-        "keywords": ["javascript", "js", "javascript developer", "ecmascript", "es6"],
-        "response": """Gabriel is proficient in JavaScript (85% proficiency):
-
-**JavaScript Expertise:**
-• ES6+ features and modern syntax
-• Async/await and promises
-• DOM manipulation
-• API integration
-• Frontend and backend development
-
-**Used in:**
-• React.js applications
-• Node.js backend services
-• API development
-• Full-stack projects
-
-<a href="#skills" class="chatbot-link">💻 Click here to view all JavaScript skills</a>"""
-    },
-    
-    # Node.js
-    "nodejs": {
-        "keywords": ["node.js", "nodejs", "node", "backend", "server"],
-        "response": """Gabriel has strong Node.js skills (85% proficiency):
-
-**Node.js Expertise:**
-• RESTful API development
-• Express.js framework
-• Server-side development
-• Database integration (MongoDB)
-• Real-time applications
-
-**Projects using Node.js:**
-• FEU Tech AI Chatbot backend
-• AI Skill Assessment system
-• Multiple API services
-
-<a href="#projects" class="chatbot-link">🟢 Click here to view Node.js projects</a>"""
-    },
-    
-    # MongoDB
-    "mongodb": {
-        "keywords": ["mongodb", "mongo", "database", "nosql", "db"],
-        "response": """Gabriel is skilled in MongoDB (80% proficiency):
-
-**MongoDB Expertise:**
-• Database design and schema
-• Query optimization
-• Data modeling
-• Aggregation pipelines
-• Integration with Node.js
-
-**Used in:**
-• FEU Tech AI Chatbot
-• AI Skill Assessment
-• Data analytics projects
-
-<a href="#skills" class="chatbot-link">🍃 Click here to view database skills</a>"""
-    },
-    
-    # Java
-    "java": {
-        "keywords": ["java", "java programming", "java developer"],
-        "response": """Gabriel is proficient in Java (80% proficiency):
-
-**Java Expertise:**
-• Object-oriented programming
-• Application development
-• Testing with JUnit
-• Backend services
-• Enterprise applications
-
-**Projects using Java:**
-• TALA Calendar Assistant
-• Web development projects
-• Testing frameworks
-
-<a href="#projects" class="chatbot-link">☕ Click here to view Java projects</a>"""
-    },
-    
-    # Testing Tools
-    "testing_tools": {
-        "keywords": ["postman", "selenium", "pytest", "junit", "test automation", "automation testing"],
-        "response": """Gabriel is expert in testing tools:
-
-**Testing Tools:**
-• **Postman** (90%) - API testing and automation
-• **PyTest** (90%) - Python testing framework
-• **Selenium** (85%) - Web automation testing
-• **JUnit** (75%) - Java unit testing
-
-**Achievements:**
-• Created 500+ automated tests
-• Achieved 95%+ test coverage
-• Reduced testing time by 60%
-
-<a href="#skills" class="chatbot-link">🧪 Click here to view testing expertise</a>"""
-    },
-    
-    # AWS
-    "aws": {
-        "keywords": ["aws", "amazon web services", "cloud", "cloud computing"],
-        "response": """Gabriel has AWS experience (70% proficiency):
-
-**AWS Knowledge:**
-• Cloud services deployment
-• Infrastructure management
-• Service integration
-• Scalable solutions
-
-**Used for:**
-• Project deployments
-• Cloud-based applications
-• Scalable infrastructure
-
-<a href="#skills" class="chatbot-link">☁️ Click here to view cloud skills</a>"""
-    },
-    
-    # Specific Projects
-    "tala_project": {
-        "keywords": ["tala", "calendar assistant", "calendar app", "scheduling"],
-        "response": """**TALA: AI-Powered Calendar Assistant** is Gabriel's capstone project:
-
-**Features:**
-• AI-driven scheduling
-• Conflict detection and resolution
-• Calendar API integration
-• Cross-platform compatibility
-
-**Achievements:**
-• 95%+ test coverage
-• 80% reduction in scheduling conflicts
-• 200+ test cases created
-• Real-time synchronization
-
-**Technologies:** Python, Java
-
-<a href="#projects" class="chatbot-link">📅 Click here to view all project details</a>"""
-    },
-    
-    "feu_chatbot": {
-        "keywords": ["feu chatbot", "feu tech chatbot", "chatbot project"],
-        "response": """**FEU Tech AI Chatbot** is a major AI project:
-
-**Features:**
-• GPT-4 powered responses
-• LangChain integration
-• Semantic search
-• Real-time responses
-
-**Achievements:**
-• 98%+ response accuracy
-• 68% response time improvement (2.5s → 0.8s)
-• 1000+ daily queries handled
-• 99.9% uptime
-
-**Technologies:** GPT-4, LangChain, MongoDB, Node.js, Express.js, React.js
-
-<a href="#projects" class="chatbot-link">🤖 Click here to view all AI projects</a>"""
-    },
-    
-    # Education Details
-    "feu": {
-        "keywords": ["feu", "far eastern university", "institute of technology", "school", "university"],
-        "response": """Gabriel studies at **FEU Institute of Technology**:
-
-**Degree:** Bachelor of Science in Computer Science (In Progress)
-
-**Relevant Coursework:**
-• Software Quality Assurance
-• Software Engineering
-• Database Management
-• Artificial Intelligence
-• Networking Fundamentals
-
-**Activities:**
-• Organizer - CS Expo 2024
-• Organizer - The Grand Cyber League
-• Participant - Multiple tech events
-
-<a href="#education" class="chatbot-link">🎓 Click here to view full education</a>"""
-    },
-    
-    # Certifications Details
-    "cisco_cert": {
-        "keywords": ["cisco", "ccna", "devnet", "networking certification"],
-        "response": """Gabriel holds Cisco certifications:
-
-**Cisco Certifications:**
-• **Cisco DevNet Associate** (Dec 2023)
-• **CCNA: Introduction to Networks** (Jul 2023)
-
-These certifications demonstrate expertise in networking fundamentals and network automation.
-
-<a href="#education" class="chatbot-link">🎓 Click here to view all certifications</a>"""
-    },
-    
-    "google_cert": {
-        "keywords": ["google certification", "google ai", "google course"],
-        "response": """Gabriel has multiple Google certifications (2025):
-
-**Google Certifications:**
-• Accelerate Your Job Search with AI
-• Discover the Art of Prompting
-• Introduction to AI
-
-These demonstrate his commitment to AI and professional development.
-
-<a href="#education" class="chatbot-link">🎓 Click here to view all certifications</a>"""
-    },
-    
-    # Contact Details
-    "email": {
-        "keywords": ["email", "email address", "gmail", "contact email"],
-        "response": """Gabriel's email address:
-
-📧 **gabrielparasabiog@gmail.com**
-
-He's responsive and always open to discussing opportunities, projects, or collaborations!
-
-<a href="#contact" class="chatbot-link">📞 Click here for full contact information</a>"""
-    },
-    
-    "website": {
-        "keywords": ["website", "portfolio website", "personal website", "site"],
-        "response": """Gabriel's website:
-
-🌐 **www.reallygreatsite.com**
-
-You're currently viewing his portfolio website which showcases all his work, projects, and achievements!
-
-<a href="#contact" class="chatbot-link">🌐 Click here for contact details</a>"""
-    },
-    
-    # Skills Details
-    "programming_languages": {
-        "keywords": ["programming languages", "languages", "what languages", "coding languages"],
-        "response": """Gabriel is proficient in multiple programming languages:
-
-**Primary Languages:**
-• **Python** (90%) - AI/ML, data analysis, automation
-• **JavaScript** (85%) - Full-stack development
-• **Java** (80%) - Application development
-• **C++** (75%) - System programming
-
-**Usage:**
-• Python for AI/ML projects and data analysis
-• JavaScript for web development (React, Node.js)
-• Java for enterprise applications
-• C++ for system-level programming
-
-<a href="#skills" class="chatbot-link">💻 Click here to view all technical skills</a>"""
-    },
-    
-    "full_stack": {
-        "keywords": ["full stack", "fullstack", "full-stack developer", "full stack developer"],
-        "response": """Gabriel is a **Full-Stack Developer**:
-
-**Frontend:**
-• React.js, HTML, CSS
-• Responsive design
-• Modern UI/UX
-
-**Backend:**
-• Node.js, Express.js
-• REST APIs
-• Database integration
-
-**Full-Stack Projects:**
-• FEU Tech AI Chatbot (React + Node.js)
-• AI Tutor (React + Python backend)
-• This portfolio website
-
-<a href="#projects" class="chatbot-link">🚀 Click here to view full-stack projects</a>"""
-    },
-    
-    # Experience Details
-    "internship": {
-        "keywords": ["intern", "internship", "intern position", "current position"],
-        "response": """Gabriel is currently an **AI Developer Intern (Fullstack)** at FEU Institute of Technology:
-
-**Duration:** Dec 2024 – Jul 2025 (3 months)
-
-**Key Achievements:**
-• Improved chatbot accuracy by 15%
-• Reduced API response time by 40%
-• Created 500+ unit and integration tests
-• Achieved 95%+ test coverage
-
-**Responsibilities:**
-• AI chatbot feature development
-• API testing and optimization
-• Bug tracking and documentation
-• Frontend-backend collaboration
-
-<a href="#experience" class="chatbot-link">💼 Click here to view full experience</a>"""
-    },
-    
-    "teleperformance": {
-        "keywords": ["teleperformance", "customer service", "csr", "call center"],
-        "response": """Gabriel worked as **Customer Service Representative** at Teleperformance, Manila:
-
-**Duration:** 2 years
-
-**Key Achievements:**
-• 95%+ customer satisfaction rate
-• Zero compliance violations
-• Top 10% performance rating
-• Trained 15+ new team members
-
-**Responsibilities:**
-• Supported 1000+ healthcare and financial clients
-• Maintained 100% HIPAA/financial compliance
-• Handled 50+ calls daily
-• First-call resolution rate: 95%+
-
-<a href="#experience" class="chatbot-link">💼 Click here to view full experience</a>"""
-    },
-    
-    # Achievements Details
-    "test_coverage": {
-        "keywords": ["test coverage", "coverage", "testing percentage", "how much test"],
-        "response": """Gabriel maintains **95%+ test coverage** across all projects:
-
-**Testing Excellence:**
-• 500+ unit and integration tests created
-• Automated testing pipelines
-• Comprehensive test cases
-• Continuous testing integration
-
-**Tools Used:**
-• PyTest for Python projects
-• JUnit for Java projects
-• Selenium for web automation
-• Postman for API testing
-
-**Results:**
-• Reduced bugs by 70%
-• Improved code quality
-• Faster deployment confidence
-
-<a href="#stats" class="chatbot-link">📊 Click here to view all achievements</a>"""
-    },
-    
-    "projects_count": {
-        "keywords": ["how many projects", "number of projects", "projects completed", "total projects"],
-        "response": """Gabriel has completed **15+ projects**:
-
-**Project Categories:**
-• 4 Major AI/ML Projects
-• Multiple web applications
-• Data analysis projects
-• Testing and QA projects
-• Full-stack applications
-
-**Featured Projects:**
-• TALA Calendar Assistant
-• FEU Tech AI Chatbot
-• AI Skill Assessment
-• AI Tutor
-• And 11+ more projects!
-
-<a href="#projects" class="chatbot-link">🚀 Click here to view all projects</a>"""
-    },
-    
-    # Methodology & Approach
-    "methodology": {
-        "keywords": ["methodology", "approach", "how do you work", "work style", "process"],
-        "response": """Gabriel follows best practices and methodologies:
-
-**Development Approach:**
-• Agile/Scrum methodologies
-• Test-driven development (TDD)
-• Continuous integration
-• Code reviews and collaboration
-
-**Quality Assurance:**
-• Comprehensive testing (95%+ coverage)
-• Bug tracking and documentation
-• Performance optimization
-• User experience focus
-
-**Project Management:**
-• Organized and structured approach
-• Clear documentation
-• Team collaboration
-• Timely delivery
-
-<a href="#experience" class="chatbot-link">💼 Click here to learn more</a>"""
-    },
-    
-    # Goals & Objectives
-    "goals": {
-        "keywords": ["goals", "objectives", "future plans", "career goals", "aspirations"],
-        "response": """Gabriel's goals and aspirations:
-
-**Career Goals:**
-• Continue growing as an AI/ML developer
-• Contribute to innovative tech solutions
-• Lead impactful projects
-• Mentor and share knowledge
-
-**Focus Areas:**
-• Advanced AI/ML technologies
-• Full-stack development excellence
-• Quality assurance leadership
-• Data-driven solutions
-
-**Values:**
-• Continuous learning
-• Quality and excellence
-• Innovation and creativity
-• Collaboration and teamwork
-
-<a href="#about" class="chatbot-link">📖 Click here to learn more about Gabriel</a>"""
-    },
-    
-    # Team Work
-    "teamwork": {
-        "keywords": ["team", "teamwork", "collaboration", "team player", "work with others"],
-        "response": """Gabriel is an excellent team collaborator:
-
-**Team Experience:**
-• 5+ successful team collaborations
-• Cross-functional team work
-• Agile team environments
-• Remote collaboration
-
-**Collaboration Skills:**
-• Clear communication
-• Active participation
-• Knowledge sharing
-• Conflict resolution
-
-**Team Projects:**
-• IEMELIF Church Website (Team of 4)
-• CS Expo 2024 (Event organization)
-• Multiple academic projects
-
-<a href="#experience" class="chatbot-link">👥 Click here to view team projects</a>"""
-    },
-    
-    # Challenges & Problem Solving
-    "challenges": {
-        "keywords": ["challenge", "challenges", "problems", "difficulties", "obstacles"],
-        "response": """Gabriel has overcome various challenges:
-
-**Technical Challenges:**
-• Optimized API response time by 68%
-• Reduced scheduling conflicts by 80%
-• Achieved 100% cross-browser compatibility
-• Processed 100,000+ data points efficiently
-
-**Problem-Solving Approach:**
-• Analytical thinking
-• Systematic debugging
-• Research and learning
-• Collaborative solutions
-
-**Results:**
-• Improved system performance
-• Enhanced user experience
-• Reliable solutions
-• Measurable improvements
-
-<a href="#projects" class="chatbot-link">🚀 Click here to see problem-solving in action</a>"""
-    },
-    
-    # Timeline & Schedule
-    "timeline": {
-        "keywords": ["when", "timeline", "schedule", "availability", "when available", "start date"],
-        "response": """Gabriel's availability and timeline:
-
-**Current Status:**
-• AI Developer Intern until Jul 2025
-• Available for new opportunities
-• Open to discussions
-
-**Availability:**
-• Full-time positions
-• Part-time projects
-• Freelance work
-• Remote or local (Metro Manila)
-
-**Response Time:**
-• Quick response to inquiries
-• Flexible scheduling
-• Professional communication
-
-<a href="#contact" class="chatbot-link">📞 Click here to get in touch</a>"""
-    },
-    
-    # Salary & Rates (Professional)
-    "compensation": {
-        "keywords": ["salary", "rate", "compensation", "pay", "fee", "price", "cost"],
-        "response": """For compensation and rates:
-
-Gabriel is open to discussing compensation based on:
-• Project scope and complexity
-• Time commitment required
-• Role and responsibilities
-• Market standards
-
-**Best to discuss:**
-• Via email for detailed discussion
-• Based on specific project needs
-• Mutually beneficial arrangements
-
-Please reach out to discuss opportunities and we can discuss compensation details!
-
-<a href="#contact" class="chatbot-link">📧 Click here to contact Gabriel</a>"""
-    },
-    
-    # Hobbies & Interests
-    "hobbies": {
-        "keywords": ["hobby", "hobbies", "interests", "what do you like", "free time", "passion"],
-        "response": """Gabriel's interests and passions:
-
-**Professional Interests:**
-• AI and Machine Learning
-• Data Analysis
-• Software Development
-• Quality Assurance
-• Emerging Technologies
-
-**Activities:**
-• Organizing tech events (CS Expo 2024)
-• Participating in tech conferences
-• Continuous learning and upskilling
-• Contributing to projects
-
-**Values:**
-• Innovation and creativity
-• Quality and excellence
-• Knowledge sharing
-• Professional growth
-
-<a href="#about" class="chatbot-link">📖 Click here to learn more</a>"""
-    },
-    
-    # Remote Work
-    "remote": {
-        "keywords": ["remote", "remote work", "work from home", "wfh", "remote position"],
-        "response": """Gabriel is open to remote work:
-
-**Remote Work Experience:**
-• Comfortable with remote collaboration
-• Effective communication skills
-• Self-motivated and organized
-• Time management expertise
-
-**Remote Capabilities:**
-• Video conferencing
-• Project management tools
-• Version control (Git)
-• Cloud-based development
-
-**Available For:**
-• Fully remote positions
-• Hybrid arrangements
-• Remote-first companies
-
-<a href="#contact" class="chatbot-link">💼 Click here to discuss remote opportunities</a>"""
-    },
-    
-    # Languages (Spoken)
-    "spoken_languages": {
-        "keywords": ["language", "languages", "speak", "fluent", "bilingual", "english", "tagalog", "filipino"],
-        "response": """Gabriel's language skills:
-
-**Languages:**
-• **English** - Fluent (Professional)
-• **Filipino/Tagalog** - Native
-
-**Communication:**
-• Professional English communication
-• Technical documentation
-• Client interactions
-• Team collaboration
-
-**Experience:**
-• 2 years customer service (English)
-• International client support
-• Technical presentations
-
-<a href="#contact" class="chatbot-link">💬 Click here to get in touch</a>"""
-    },
-    
-    # References
-    "references": {
-        "keywords": ["reference", "references", "recommendation", "recommendations", "testimonial"],
-        "response": """For references and recommendations:
-
-Gabriel can provide professional references from:
-• FEU Institute of Technology (Current employer)
-• Previous employers
-• Project collaborators
-• Academic advisors
-
-**Best Practice:**
-Contact Gabriel directly via email to request references. He's happy to provide professional recommendations based on your needs.
-
-<a href="#contact" class="chatbot-link">📧 Click here to request references</a>"""
-    },
-    
-    # Portfolio Details
-    "portfolio_details": {
-        "keywords": ["portfolio details", "portfolio info", "what's in portfolio", "portfolio content"],
-        "response": """This portfolio includes:
-
-**Sections:**
-• **About** - Introduction and background
-• **Stats** - Key achievements and metrics
-• **Skills** - Technical and professional skills
-• **Experience** - Work history and roles
-• **Projects** - 15+ completed projects
-• **Education** - Academic background and certifications
-• **Contact** - Ways to reach Gabriel
-
-**Features:**
-• Interactive chatbot (you're using it!)
-• Dark/Light mode
-• Responsive design
-• 3D animations
-• Detailed project information
-
-Explore the sections above to learn more!
-
-<a href="#projects" class="chatbot-link">🚀 Start exploring the portfolio</a>"""
-    },
-    
-    # Help
-    "help": {
-        "keywords": ["help", "what can you do", "what questions", "how to use", "commands", "assistance"],
-        "response": """I can help you learn about Gabriel! Here's what you can ask:
-
-**About Gabriel:**
-• "Who is Gabriel?"
-• "Tell me about yourself"
-• "What do you do?"
-
-**Experience & Work:**
-• "What's your experience?"
-• "Where do you work?"
-• "Tell me about your jobs"
-
-**Projects:**
-• "What projects have you done?"
-• "Show me your work"
-• "Tell me about TALA"
-
-**Skills & Tech:**
-• "What technologies do you use?"
-• "What are your skills?"
-• "Do you know Python/React?"
-
-**Contact:**
-• "How can I contact you?"
-• "What's your email?"
-• "Are you available for work?"
-
-**Just ask naturally - I understand many ways to ask questions!**"""
-    },
-    
-    # Greetings
-    "greetings": {
-        "keywords": ["hello", "hi", "hey", "greetings", "good morning", "good afternoon", "good evening"],
-        "response": """Hello! 👋 
-
-I'm here to help you learn about Gabriel Paras Abiog, an AI Developer and Data Analyst.
-
-**You can ask me:**
-• Who is Gabriel?
-• About his experience and projects
-• His skills and technologies
-• How to contact him
-• And much more!
-
-What would you like to know? 😊"""
-    },
-    
-    # Thanks
-    "thanks": {
-        "keywords": ["thank", "thanks", "thank you", "appreciate", "grateful"],
-        "response": """You're welcome! 😊
-
-I'm glad I could help you learn about Gabriel. If you have any more questions, feel free to ask!
-
-**You might also want to:**
-• View his projects
-• Check out his skills
-• See his achievements
-• Get in touch
-
-Is there anything else you'd like to know?"""
-    },
-    
-    # Goodbye
-    "goodbye": {
-        "keywords": ["bye", "goodbye", "see you", "farewell", "later"],
-        "response": """Goodbye! 👋
-
-Thanks for visiting Gabriel's portfolio. Feel free to come back anytime if you have more questions!
-
-**Don't forget to:**
-• Check out his projects
-• View his contact information
-• Explore the portfolio sections
-
-Have a great day! 😊"""
-    },
-    
-    # Default response
-    "default": {
-        "keywords": [],
-        "response": """Hello! I'm here to help you learn about Gabriel Paras Abiog, an AI Developer and Data Analyst.
-
-**Popular Questions:**
-• "Who is Gabriel?" - Introduction
-• "Tell me about your projects" - See his work
-• "What technologies do you use?" - Tech stack
-• "What are your achievements?" - Metrics and stats
-• "What is your experience?" - Work history
-• "How can I contact you?" - Contact info
-
-**You can also ask about:**
-• Specific projects (TALA, FEU Chatbot, etc.)
-• Specific technologies (Python, React, Node.js, etc.)
-• Education and certifications
-• Testing and QA expertise
-• AI/ML projects
-• Availability for work
-• Location and contact details
-• Team work and collaboration
-• And much more!
-
-**Just ask naturally - I understand many ways to phrase questions!**
-
-<a href="#about" class="chatbot-link">📖 Or explore the portfolio sections above</a>"""
-    }
-}
-
-def find_best_match(user_message):
-    """Find the best matching Q&A pair based on keywords"""
-    user_message_lower = user_message.lower()
-    
-    # Count keyword matches for each category
-    match_scores = {}
-    for category, data in qa_pairs.items():
-        if category == "default":
-            continue
-        score = sum(1 for keyword in data["keywords"] if keyword in user_message_lower)
-        if score > 0:
-            match_scores[category] = score
-    
-    # Return the category with the highest score
-    if match_scores:
-        best_match = max(match_scores, key=match_scores.get)
-        return qa_pairs[best_match]["response"]
-    
-    # If no match, try to provide a helpful default response
-    return qa_pairs["default"]["response"]
-
-@app.route('/api/chat', methods=['POST'])
+@app.before_request
+def start_timer():
+    g.started = perf_counter()
+
+@app.after_request
+def record_request(response):
+    endpoint = request.endpoint or 'unknown'
+    elapsed = perf_counter() - g.started if 'started' in g else 0.0
+    if 'started' in g:
+        request_seconds.observe(elapsed, endpoint)
+    responses_total.inc(endpoint, str(response.status_code))
+    error = g.get('error')
+    if access_log is not None and access_log.wants(response.status_code, elapsed, error is not None):
+        access_log.request(
+            request.method, request.path, response.status_code, elapsed, error,
+            endpoint=endpoint, category=g.get('category'), language=g.get('language'),
+            rateLimit=g.get('rate_limit')
+        )
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Compress dynamic bodies such as /api/health; chat answers come precompressed"""
+    if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+            or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    accepted = accepted_encodings(request.headers.get('Accept-Encoding'))
+    if len(body) < MIN_DYNAMIC_SIZE or not accepted:
+        return response
+    encoding = 'br' if 'br' in accepted else 'gzip'
+    compressed = compress(body, encoding, dynamic=True)
+    if len(compressed) < len(body):
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        compression_saved_total.inc(encoding, 'dynamic', amount=len(body) - len(compressed))
+    return response
+
+
+# "token" counts keywords found as whole words; "keyword" counts them as
+# substrings anywhere ("hi" inside "this"); "bm25" ranks categories by
+# weighted terms so rare, specific keywords outweigh generic ones
+CHAT_MATCHER = os.environ.get('CHAT_MATCHER', 'token')
+
+def load_retrieval(setting):
+    """The numpy-backed retrieval module, or a configuration error naming setting"""
+    # numpy is only needed for ranked and vector retrieval
+    try:
+        import retrieval
+    except ImportError as e:
+        raise RuntimeError(f'{setting} needs numpy; install backend/requirements.txt') from e
+    return retrieval
+
+def create_matcher(qa_pairs, segmenter=None):
+    if CHAT_MATCHER == 'keyword':
+        # Substring matching needs no word boundaries, Chinese included
+        return KeywordMatcher(qa_pairs)
+    if CHAT_MATCHER == 'bm25':
+        return load_retrieval('CHAT_MATCHER=bm25').Bm25Matcher(qa_pairs, segmenter=segmenter)
+    return TokenIndexMatcher(qa_pairs, segmenter)
+
+# Messages that match nothing are retried with misspelled words corrected
+# to the nearest keyword word within this many edits (0 turns it off)
+CHAT_FUZZY_DISTANCE = int(os.environ.get('CHAT_FUZZY_DISTANCE', '2'))
+
+# Messages that still match nothing go to hashed character n-gram vectors of
+# the keywords and example questions, which catch paraphrases; answered only
+# at this cosine similarity or above (0 turns it off, needs numpy)
+CHAT_VECTOR_THRESHOLD = float(os.environ.get('CHAT_VECTOR_THRESHOLD', '0'))
+
+def compile_knowledge(qa_pairs, language=DEFAULT_LANGUAGE):
+    """Match index, plus sanitized HTML, hasLinks flag and encoded JSON body for every category"""
+    segmenter = ChineseSegmenter.for_intents(qa_pairs) if language == 'zh' else None
+    matcher = create_matcher(qa_pairs, segmenter)
+    if CHAT_FUZZY_DISTANCE > 0:
+        index = SymSpellIndex.for_intents(qa_pairs, segmenter, max_distance=CHAT_FUZZY_DISTANCE)
+        matcher = FuzzyMatcher(matcher, index, segmenter)
+    if CHAT_VECTOR_THRESHOLD > 0:
+        vectors = load_retrieval('CHAT_VECTOR_THRESHOLD').VectorMatcher(
+            qa_pairs, threshold=CHAT_VECTOR_THRESHOLD, segmenter=segmenter
+        )
+        matcher = FallbackMatcher(matcher, vectors)
+    return matcher, compile_responses(qa_pairs, app.json.dumps)
+
+# Intents come from a data file that is watched and reloaded on change. The
+# compiled index is snapshotted so restarts with the same file skip the build.
+# Each other language adds an overlay file next to it (knowledge_base.zh.json)
+# and gets its own index, built the first time a message needs it.
+KB_PATH = os.environ.get('KB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'knowledge_base.json'))
+# Snapshots (unpickled), sessions, misses (user messages) and profiles
+# default to a private (0700) cache directory rather than the shared temp
+# directory, where anyone could plant a file or symlink under these names
+CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'portfolio-chat'
+)
+KB_SNAPSHOT_PATH = os.environ.get('KB_SNAPSHOT_PATH', os.path.join(CACHE_DIR, f'kb-{CHAT_MATCHER}.snapshot'))
+KB_RELOAD_INTERVAL = float(os.environ.get('KB_RELOAD_INTERVAL', '2'))  # seconds, 0 disables
+# Modules whose code shapes the snapshot; a deploy that changes any of
+# them rebuilds it instead of unpickling objects of the old classes
+KB_CODE_MODULES = ('app', 'fuzzy', 'language', 'matcher', 'responses', 'retrieval')
+
+kb_load_seconds = metrics.gauge(
+    'chat_kb_load_seconds', 'Time to build or load the current knowledge base', mode='max', labelnames=('language',)
+)
+kb_index_bytes = metrics.gauge(
+    'chat_kb_index_bytes', 'Serialized size of the compiled knowledge base', mode='max', labelnames=('language',)
+)
+
+def record_knowledge(language, kb):
+    kb_load_seconds.set(kb.load_seconds, language)
+    kb_index_bytes.set(kb.index_bytes, language)
+
+def open_knowledge(language, on_swap):
+    """Open the store for one language; languages without a file share English"""
+    overlay = language_path(KB_PATH, language, DEFAULT_LANGUAGE)
+    if language != DEFAULT_LANGUAGE and not os.path.exists(overlay):
+        return knowledge.get(DEFAULT_LANGUAGE)
+
+    def swapped(previous, current):
+        on_swap(previous, current)
+        record_knowledge(language, current)
+
+    store = KnowledgeBaseStore(
+        KB_PATH, partial(compile_knowledge, language=language), variant=f'{CHAT_MATCHER}:{CHAT_FUZZY_DISTANCE}:{CHAT_VECTOR_THRESHOLD}:{language}',
+        snapshot_path=language_path(KB_SNAPSHOT_PATH, language, DEFAULT_LANGUAGE),
+        poll_interval=KB_RELOAD_INTERVAL, on_swap=swapped,
+        overlays=[overlay] if language != DEFAULT_LANGUAGE else [], code=KB_CODE_MODULES,
+    )
+    record_knowledge(language, store.current)
+    return store
+
+def knowledge_swapped(previous, current):
+    # Cached answers belong to the old version; they could never be hit again
+    answer_cache.clear()
+
+knowledge = KnowledgeBases(open_knowledge, on_swap=knowledge_swapped)
+knowledge.get(DEFAULT_LANGUAGE)
+language_detector = LanguageDetector()
+
+# Repeated questions (pre-prompts, greetings) skip straight to the prepared
+# answer. Guard and matcher ignore case, so the key is the lowercased message
+# and declared language, tagged with the knowledge base generation.
+# Only messages short enough that escaping can never truncate them are cached.
+CHAT_CACHE_SIZE = int(os.environ.get('CHAT_CACHE_SIZE', '1024'))
+CHAT_CACHE_TTL = float(os.environ.get('CHAT_CACHE_TTL', '3600'))  # seconds
+CACHEABLE_LENGTH = MAX_MESSAGE_LENGTH // 5
+
+answer_cache = AnswerCache(CHAT_CACHE_SIZE, CHAT_CACHE_TTL)
+
+# Each session remembers the categories it was answered with, so follow-ups
+# lean towards the previous answer and the intents related to it. Recent
+# sessions stay in memory; all of them are written to SQLite in batches so
+# they survive eviction, other workers and restarts ('' keeps memory only).
+CHAT_SESSION_MAX = int(os.environ.get('CHAT_SESSION_MAX', '10000'))
+CHAT_SESSION_TURNS = int(os.environ.get('CHAT_SESSION_TURNS', '5'))
+CHAT_SESSION_TTL = float(os.environ.get('CHAT_SESSION_TTL', '1800'))  # seconds
+CHAT_SESSION_DB = os.environ.get('CHAT_SESSION_DB', os.path.join(CACHE_DIR, 'sessions.db'))
+
+session_store = SessionStore(CHAT_SESSION_DB or None, CHAT_SESSION_MAX, CHAT_SESSION_TURNS, CHAT_SESSION_TTL)
+
+# Messages answered with the default response, PII scrubbed, are appended
+# to this JSON Lines file for tools/miss_report.py ("" turns capture off)
+CHAT_MISS_LOG = os.environ.get('CHAT_MISS_LOG', os.path.join(CACHE_DIR, 'misses.jsonl'))
+CHAT_MISS_BUFFER = int(os.environ.get('CHAT_MISS_BUFFER', '1000'))
+CHAT_MISS_FLUSH_INTERVAL = float(os.environ.get('CHAT_MISS_FLUSH_INTERVAL', '5'))  # seconds
+CHAT_MISS_SCRUB = os.environ.get('CHAT_MISS_SCRUB', 'true').lower() in ('1', 'true', 'yes')
+
+miss_log = MissLog(CHAT_MISS_LOG, CHAT_MISS_BUFFER, CHAT_MISS_FLUSH_INTERVAL, scrub=CHAT_MISS_SCRUB) if CHAT_MISS_LOG else None
+
+def find_best_category(message, kb=None, turns=()):
+    """Find the best matching Q&A category for a normalized message"""
+    kb = kb or knowledge.get(DEFAULT_LANGUAGE).current
+    related = ()
+    if turns:
+        previous = kb.qa_pairs.get(turns[-1], {})
+        related = previous.get("related", ())
+        # Ties go to the previous answer's topic
+        best_match = kb.matcher.best_category(message.lowered, (turns[-1], *related))
+    else:
+        best_match = kb.matcher.best_category(message.lowered)
+    
+    if best_match is None and related and is_follow_up(message.lowered):
+        # "Tell me more": the first related intent not answered recently
+        best_match = next((category for category in related if category not in turns), None)
+    
+    # If no match, fall back to the helpful default response
+    return best_match or "default"
+
+def answer_message(user_message, user_language, session_id=None, use_turns=True):
+    """Answer one stripped message through the cache, guard and matcher
+
+    Returns (status, result): a PreparedResponse with status 200, or the
+    error text to send back with a 400. With use_turns false the answer is
+    still recorded in the session but does not depend on its earlier turns.
+    """
+    # Validate and sanitize input
+    if not user_message:
+        return 400, 'Please send a message!'
+    # Before any scan, so an oversized body costs nothing to turn away
+    if len(user_message) > MAX_MESSAGE_LENGTH:
+        return 400, 'Message too long. Maximum 500 characters.'
+    
+    started = perf_counter()
+    session_id = valid_session_id(session_id)
+    # Loaded even when unused, so recording the answer keeps the earlier turns
+    turns = session_store.get(session_id) if session_id else ()
+    if not use_turns:
+        turns = ()
+    cache_key = None
+    if len(user_message) <= CACHEABLE_LENGTH:
+        cache_key = (knowledge.generation, user_message.lower(), str(user_language), turns)
+        prepared = answer_cache.get(cache_key)
+        now = perf_counter()
+        stage_seconds.observe(now - started, 'cache')
+        started = now
+        if prepared is not None:
+            if prepared.category == "default" and miss_log is not None:
+                # Repeated misses count too; only they pay for the guard again
+                message = guard_message(user_message)
+                if message is not None:
+                    miss_log.record(message.text, resolve_language(user_language, message.lowered, language_detector))
+            return 200, count_answer(prepared, session_id)
+    
+    # One precompiled guard pass validates, sanitizes and lowercases
+    message = guard_message(user_message)
+    now = perf_counter()
+    stage_seconds.observe(now - started, 'guard')
+    started = now
+    if message is None:
+        return 400, 'Invalid input detected. Please use only text.'
+    
+    # The declared language unless the text is clearly in another one; one
+    # knowledge base answers the whole request, even if a reload lands
+    language = resolve_language(user_language, message.lowered, language_detector)
+    store = knowledge.get(language)
+    store.ensure_watching()
+    kb = store.current
+
+    # Get response based on keyword matching
+    prepared = kb.responses[find_best_category(message, kb, turns)]
+    stage_seconds.observe(perf_counter() - started, 'match')
+    if prepared.category == "default" and miss_log is not None:
+        miss_log.record(message.text, language)
+    if cache_key is not None:
+        answer_cache.put(cache_key, prepared)
+    return 200, count_answer(prepared, session_id)
+
+def count_answer(prepared, session_id=None):
+    matched_total.inc(prepared.category)
+    if prepared.category == "default":
+        default_fallbacks_total.inc()
+    elif session_id:
+        session_store.record(session_id, prepared.category)
+    return prepared
+
+def answer_request(data, session_id=None, use_turns=True):
+    """Answer a decoded /api/chat request body
+
+    The session ID comes from the body's "sessionId", or else the
+    X-Session-Id header passed in as session_id. Returns (status, result)
+    like answer_message.
+    """
+    if not data or 'message' not in data:
+        return 400, 'Message is required.'
+    
+    user_message = str(data.get('message', '')).strip()
+    user_language = data.get('language', 'en')  # Get language from request
+    return answer_message(user_message, user_language, data.get('sessionId') or session_id, use_turns)
+
+# GET /api/chat answers are the same for everyone asking the same question,
+# so browsers and CDNs may keep them this many seconds and revalidate after
+CHAT_HTTP_MAX_AGE = int(os.environ.get('CHAT_HTTP_MAX_AGE', '300'))
+
+def get_chat_data(args):
+    """The message and language of a GET /api/chat query string
+
+    Session IDs are left out: a cacheable URL has to mean one answer. An
+    X-Session-Id header only records the answer for later follow-ups.
+    """
+    return {key: args[key] for key in ('message', 'language') if key in args}
+
+# Profiling of chat() in place, off unless a rate or a secret is set. Either
+# way only requests picked by the rate or carrying a fresh X-Chat-Profile
+# token signed with the secret (tools/profile_token.py) are profiled.
+CHAT_PROFILE_RATE = float(os.environ.get('CHAT_PROFILE_RATE', '0'))  # fraction of requests
+CHAT_PROFILE_SECRET = os.environ.get('CHAT_PROFILE_SECRET', '')
+CHAT_PROFILE_MODE = os.environ.get('CHAT_PROFILE_MODE', 'stacks')  # stacks or pstats
+CHAT_PROFILE_INTERVAL = float(os.environ.get('CHAT_PROFILE_INTERVAL', '0.001'))  # seconds between stack samples
+CHAT_PROFILE_DIR = os.environ.get('CHAT_PROFILE_DIR', os.path.join(CACHE_DIR, 'profiles'))
+
+profiler = None
+if CHAT_PROFILE_RATE > 0 or CHAT_PROFILE_SECRET:
+    from profiling import RequestProfiler
+    profiler = RequestProfiler(CHAT_PROFILE_DIR, CHAT_PROFILE_RATE, CHAT_PROFILE_SECRET,
+                               CHAT_PROFILE_MODE, CHAT_PROFILE_INTERVAL)
+
+def profiled(f):
+    # Disabled, the view is returned untouched and costs nothing extra
+    if profiler is None:
+        return f
+    return profiler.wrap(f, lambda: request.headers.get('X-Chat-Profile'))
+
+@app.route('/api/chat', methods=['GET', 'POST'])
 @rate_limit
+@profiled
 def chat():
     try:
+        cacheable = request.method in ('GET', 'HEAD')
+        if cacheable:
+            data = get_chat_data(request.args)
+            status, result = answer_request(data, request.headers.get('X-Session-Id'), use_turns=False)
         # Validate request
-        if not request.is_json:
+        elif not request.is_json:
             return jsonify({'response': 'Invalid request format.'}), 400
+        else:
+            data = request.json
+            status, result = answer_request(data, request.headers.get('X-Session-Id'))
+        if isinstance(data, dict):
+            g.language = data.get('language', 'en')
+        if status != 200:
+            return jsonify({'response': result}), status
+        g.category = result.category
         
-        data = request.json
-        if not data or 'message' not in data:
-            return jsonify({'response': 'Message is required.'}), 400
-        
-        user_message = str(data.get('message', '')).strip()
-        user_language = data.get('language', 'en')  # Get language from request
-        
-        # Validate and sanitize input
-        if not user_message:
-            return jsonify({'response': 'Please send a message!'}), 400
-        
-        if not validate_input(user_message):
-            return jsonify({'response': 'Invalid input detected. Please use only text.'}), 400
-        
-        user_message = sanitize_input(user_message)
-        
-        # Additional length check
-        if len(user_message) > 500:
-            return jsonify({'response': 'Message too long. Maximum 500 characters.'}), 400
-        
-        # Get response based on keyword matching
-        response = find_best_match(user_message)
+        # Return the pre-sanitized, pre-encoded, precompressed response body
+        started = perf_counter()
+        encoding, body, etag = result.variant(request.headers.get('Accept-Encoding'))
+        if cacheable and etag_matches(request.headers.get('If-None-Match'), etag):
+            response = app.response_class(status=304)
+        else:
+            response = app.response_class(body, mimetype='application/json')
+            if encoding is not None:
+                response.headers['Content-Encoding'] = encoding
+                compression_saved_total.inc(encoding, 'precomputed', amount=len(result.body) - len(body))
+        if cacheable:
+            response.headers['Cache-Control'] = f'public, max-age={CHAT_HTTP_MAX_AGE}'
+        response.headers['ETag'] = etag
+        response.vary.add('Accept-Encoding')
+        stage_seconds.observe(perf_counter() - started, 'respond')
+        return response
+    
+    except Exception as e:
+        # Don't expose internal errors, but log them
+        g.error = e
+        return jsonify({'response': 'Sorry, I encountered an error. Please try again later.'}), 500
+
+@app.route('/api/chat/stream', methods=['GET', 'POST'])
+@rate_limit
+def chat_stream():
+    """Answer one message as server-sent events
+
+    Takes the same JSON body as /api/chat, or message and language query
+    parameters on GET so EventSource can use it. A "meta" event with the
+    category and hasLinks comes first, then one "chunk" event per block of
+    the answer (join their text with blank lines), then "done".
+    """
+    try:
+        if request.method == 'GET':
+            data = request.args
+        elif request.is_json:
+            data = request.json
+        else:
+            return jsonify({'response': 'Invalid request format.'}), 400
         
-        # Sanitize response (only allow safe HTML tags)
-        response = sanitize_response(response)
+        if isinstance(data, dict):
+            g.language = data.get('language', 'en')
+        status, result = answer_request(data, request.headers.get('X-Session-Id'))
+        if status != 200:
+            return jsonify({'response': result}), status
+        g.category = result.category
         
-        # Return response with HTML support for links
-        return jsonify({
-            'response': response,
-            'hasLinks': '<a href=' in response
-        })
+        # Every event is pre-encoded, so the first byte goes out immediately
+        response = app.response_class(iter(result.events), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
     
     except Exception as e:
-        # Don't expose internal errors
+        g.error = e
         return jsonify({'response': 'Sorry, I encountered an error. Please try again later.'}), 500
 
-def sanitize_response(text):
-    """Sanitize response but allow safe HTML tags"""
-    # Allow only specific safe tags
-    allowed_tags = ['a', 'strong', 'em', 'p', 'br', 'ul', 'ol', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']
-    allowed_attrs = {'a': ['href', 'class']}
-    
-    # Remove dangerous tags but keep safe ones
-    text = re.sub(r'<(?!\/?(?:' + '|'.join(allowed_tags) + ')\b)[^>]+>', '', text, flags=re.IGNORECASE)
-    
-    # Remove dangerous attributes
-    for tag in allowed_tags:
-        if tag in allowed_attrs:
-            allowed = '|'.join(allowed_attrs[tag])
-            text = re.sub(
-                rf'<{tag}\s+((?!({allowed})=)[^>]*?)({allowed})=',
-                rf'<{tag} \3=',
-                text,
-                flags=re.IGNORECASE
-            )
+# Batches are answered in groups; each group is charged to the rate limit
+# as one hit weighted by its size
+MAX_BATCH_SIZE = 100
+BATCH_GROUP_SIZE = 10
+
+def batch_entry(item, default_language):
+    """Encode the answer for one batch item as a JSON array element"""
+    if isinstance(item, str):
+        item = {'message': item}
+    if not isinstance(item, dict) or 'message' not in item:
+        return batch_error('Message is required.', 400)
     
-    return text
+    user_message = str(item.get('message', '')).strip()
+    status, result = answer_message(user_message, item.get('language', default_language), item.get('sessionId'))
+    if status != 200:
+        return batch_error(result, status)
+    return result.body.rstrip(b'\n')
+
+def batch_error(text, status):
+    return app.json.dumps({'response': text, 'status': status}, separators=(',', ':')).encode('utf-8')
+
+RATE_LIMITED_ENTRY = batch_error('Too many requests. Please wait a moment.', 429)
+
+def take_group(items, size):
+    """Read up to size items; the flag reports malformed input after them"""
+    group = []
+    try:
+        for item in islice(items, size):
+            group.append(item)
+    except ValueError:
+        return group, True
+    return group, False
+
+@app.route('/api/chat/batch', methods=['POST'])
+def chat_batch():
+    """Answer a JSON array of messages, streaming the answers back in order
+
+    Each item is a message string or an object with "message" and optional
+    "language"; ?language= sets the default. The request body is parsed
+    incrementally and every answer is written as soon as it is ready.
+    """
+    client_ip = request.remote_addr
+    default_language = request.args.get('language', 'en')
+    items = iter_json_array(request.stream)
+    
+    group, malformed = take_group(items, BATCH_GROUP_SIZE)
+    if malformed and not group:
+        return jsonify({'response': 'Invalid request format.'}), 400
+    if group:
+        g.rate_limit = 'allowed' if rate_limiter.hit(client_ip, cost=len(group)) else 'limited'
+    if g.get('rate_limit') == 'limited':
+        return jsonify({'response': 'Too many requests. Please wait a moment.'}), 429
+    
+    def generate(group, malformed):
+        entries = 0
+        limited = False
+        try:
+            while group:
+                for item in group:
+                    entry = RATE_LIMITED_ENTRY if limited else batch_entry(item, default_language)
+                    yield (b',' if entries else b'[') + entry
+                    entries += 1
+                if malformed:
+                    break
+                
+                group, malformed = take_group(items, BATCH_GROUP_SIZE)
+                if group and entries + len(group) > MAX_BATCH_SIZE:
+                    yield b',' + batch_error(f'Batch too large. Maximum {MAX_BATCH_SIZE} messages.', 413)
+                    entries += 1
+                    break
+                if group and not limited:
+                    limited = not rate_limiter.hit(client_ip, cost=len(group))
+            
+            if malformed:
+                # Headers are already sent; report the malformed tail in-band
+                yield (b',' if entries else b'[') + batch_error('Invalid request format.', 400)
+                entries += 1
+        except Exception as e:
+            # record_request already logged the response as a 200; log the
+            # failure itself here, since it only shows up in the body
+            g.error = e
+            if access_log is not None:
+                access_log.request(
+                    request.method, request.path, 500, perf_counter() - g.started, e,
+                    endpoint='chat_batch', language=default_language, rateLimit=g.get('rate_limit')
+                )
+            yield (b',' if entries else b'[') + batch_error('Sorry, I encountered an error. Please try again later.', 500)
+            entries += 1
+        yield (b']' if entries else b'[]') + b'\n'
+    
+    return app.response_class(stream_with_context(generate(group, malformed)), mimetype='application/json')
+
+# The site's pre-prompt buttons, per language; their answers are cached
+# ahead of time, so every worker starts with them
+WARMUP_MESSAGES = {
+    'en': [
+        "Who is Gabriel?", "Tell me about Gabriel's projects", "What are Gabriel's achievements?",
+        "What technologies does Gabriel use?", "How can I contact Gabriel?", "What is Gabriel's experience?",
+        "Tell me about Gabriel's AI projects", "What certifications does Gabriel have?",
+    ],
+    'tl': [
+        "Sino si Gabriel?", "Sabihin mo sa akin ang tungkol sa mga proyekto ni Gabriel",
+        "Ano ang mga tagumpay ni Gabriel?", "Ano ang mga teknolohiya na ginagamit ni Gabriel?",
+        "Paano ko macocontact si Gabriel?", "Ano ang karanasan ni Gabriel?",
+        "Sabihin mo sa akin ang tungkol sa AI projects ni Gabriel", "Ano ang mga sertipikasyon ni Gabriel?",
+    ],
+    'zh': [
+        "Gabriel是谁？", "告诉我Gabriel的项目", "Gabriel的成就是什么？", "Gabriel使用什么技术？",
+        "如何联系Gabriel？", "Gabriel的经验是什么？", "告诉我Gabriel的AI项目", "Gabriel有什么认证？",
+    ],
+}
+
+warmup = {'ready': False, 'seconds': None}
+warmup_lock = threading.Lock()
+
+def warm_up():
+    """Build every knowledge base and take each pre-prompt down the hot path once
+
+    Under gunicorn with preload this runs in the master before it forks, so
+    the workers share what it built; otherwise each process runs it before
+    serving, or on its first request when no server hook or lifespan event
+    called it. Metrics, rate limits and sessions are left untouched, and no
+    watcher threads are started. /api/health reports ready afterwards.
+    """
+    with warmup_lock:
+        if warmup['ready']:
+            return
+        started = perf_counter()
+        for language in SUPPORTED_LANGUAGES:
+            knowledge.get(language)
+        for language, messages in WARMUP_MESSAGES.items():
+            for text in messages:
+                message = guard_message(text)
+                if message is None:
+                    continue
+                kb = knowledge.get(resolve_language(language, message.lowered, language_detector)).current
+                prepared = kb.responses[find_best_category(message, kb)]
+                prepared.variant('gzip, deflate, br')
+                answer_cache.put((knowledge.generation, text.lower(), language, ()), prepared)
+        warmup.update(ready=True, seconds=perf_counter() - started)
+
+@app.before_request
+def ensure_warm():
+    # flask run, other WSGI servers and gunicorn configs without our hooks
+    # never call warm_up; the first request does it instead
+    if not warmup['ready']:
+        warm_up()
 
 @app.route('/api/health', methods=['GET'])
 def health():
-    return jsonify({'status': 'ok'}), 200
+    status = health_status()
+    return jsonify(status), 200 if warmup['ready'] else 503
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics summed over every worker"""
+    if rate_limiter.name != 'redis':
+        rate_limit_entries.set(len(rate_limiter))
+    return app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def health_status():
+    return {
+        'status': 'ok' if warmup['ready'] else 'starting',
+        'warmup': {
+            'ready': warmup['ready'],
+            'ms': round(warmup['seconds'] * 1000, 3) if warmup['seconds'] is not None else None,
+        },
+        'rateLimit': rate_limiter.stats(),
+        'answerCache': answer_cache.stats(),
+        'knowledgeBase': knowledge.stats(),
+        'sessions': session_store.stats(),
+        'accessLog': access_log.stats() if access_log is not None else None,
+        'misses': miss_log.stats() if miss_log is not None else None,
+        'profiler': profiler.stats() if profiler is not None else None
+    }
 
 if __name__ == '__main__':
-    import os
-
     # Render/Railway/etc provide PORT. Locally this falls back to 5000.
     port = int(os.environ.get('PORT', '5000'))
     debug = os.environ.get('FLASK_DEBUG', '').lower() in ('1', 'true', 'yes')
+    warm_up()
 
     # Bind to all interfaces for cloud hosting.
     app.run(host='0.0.0.0', port=port, debug=debug)
@@ -0,0 +1,223 @@
+"""ASGI entry point serving /api/chat (GET and POST) and /api/health
+
+Run under an async server, for example:
+
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT --workers 2
+
+Requests are read without holding a worker, so slow clients only cost an
+idle coroutine. Answers come from the same guard, matcher, cache and
+rate limiter as the Flask app in app.py.
+"""
+from time import perf_counter
+from urllib.parse import parse_qs
+import asyncio
+import json
+
+import app as chat_app
+from responses import MIN_DYNAMIC_SIZE, accepted_encodings, compress, etag_matches
+from sessions import valid_session_id
+
+# Request bodies for a single chat message are tiny
+MAX_BODY_SIZE = 64 * 1024
+
+INVALID_REQUEST = 'Invalid request format.'
+TOO_MANY_REQUESTS = 'Too many requests. Please wait a moment.'
+SERVER_ERROR = 'Sorry, I encountered an error. Please try again later.'
+
+ROUTES = {
+    '/api/chat': ('GET', 'POST'),
+    '/api/health': ('GET',),
+}
+
+
+def encode(payload):
+    # Same bytes as Flask's jsonify for the same payload
+    return (chat_app.app.json.dumps(payload, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+def cors_headers(headers):
+    """Mirror the headers Flask-CORS adds with its default configuration"""
+    origin = headers.get(b'origin')
+    if origin is None:
+        return [(b'access-control-allow-origin', b'*')]
+    return [(b'access-control-allow-origin', origin), (b'vary', b'Origin')]
+
+
+async def respond(send, status, body, headers, content_type=b'application/json'):
+    if status == 304:
+        # Not modified: no body, so no content headers either
+        start = [header for header in headers if header[0] != b'content-encoding']
+    else:
+        start = [(b'content-type', content_type), (b'content-length', str(len(body)).encode()), *headers]
+    await send({'type': 'http.response.start', 'status': status, 'headers': start})
+    await send({'type': 'http.response.body', 'body': body})
+    return status
+
+
+def answer_headers(encoding, etag):
+    """Headers for a precompressed answer variant"""
+    headers = [(b'etag', etag.encode()), (b'vary', b'Accept-Encoding')]
+    if encoding is not None:
+        headers.append((b'content-encoding', encoding.encode()))
+    return headers
+
+
+def count_saved(result, encoding, body):
+    if encoding is not None:
+        chat_app.compression_saved_total.inc(encoding, 'precomputed', amount=len(result.body) - len(body))
+
+
+def compressed(body, request_headers):
+    """Compress a dynamic body for the client, with the headers saying so"""
+    accepted = accepted_encodings(request_headers.get(b'accept-encoding', b'').decode('latin-1'))
+    if len(body) < MIN_DYNAMIC_SIZE or not accepted:
+        return body, [(b'vary', b'Accept-Encoding')]
+    encoding = 'br' if 'br' in accepted else 'gzip'
+    smaller = compress(body, encoding, dynamic=True)
+    if len(smaller) >= len(body):
+        return body, [(b'vary', b'Accept-Encoding')]
+    return smaller, [(b'vary', b'Accept-Encoding'), (b'content-encoding', encoding.encode())]
+
+
+async def read_body(receive):
+    """Collect the request body, or return None if it is too large"""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_SIZE:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def hit_rate_limit(client_ip):
+    if chat_app.rate_limiter.name == 'redis':
+        # Network round trip; keep it off the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, chat_app.rate_limiter.hit, client_ip)
+    return chat_app.rate_limiter.hit(client_ip)
+
+
+async def answer(data, session_id=None, use_turns=True):
+    """answer_request, run off the event loop when it may read the session database"""
+    body_session = data.get('sessionId') if isinstance(data, dict) else None
+    if chat_app.session_store.path and valid_session_id(body_session or session_id):
+        # An unseen session is looked up in SQLite, behind the writer's lock
+        return await asyncio.get_running_loop().run_in_executor(
+            None, chat_app.answer_request, data, session_id, use_turns
+        )
+    return chat_app.answer_request(data, session_id, use_turns)
+
+
+async def chat(scope, receive, send, request_headers, headers, fields):
+    """Answer /api/chat; fills fields with what the access log records"""
+    client_ip = scope['client'][0] if scope.get('client') else None
+    allowed = await hit_rate_limit(client_ip)
+    fields['rateLimit'] = 'allowed' if allowed else 'limited'
+    if not allowed:
+        return await respond(send, 429, encode({'response': TOO_MANY_REQUESTS}), headers)
+
+    try:
+        if scope['method'] == 'GET':
+            query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+            data = chat_app.get_chat_data({key: values[0] for key, values in query.items()})
+            fields['language'] = data.get('language', 'en')
+            session_id = request_headers.get(b'x-session-id')
+            status, result = await answer(data, session_id and session_id.decode('latin-1'), use_turns=False)
+            if status != 200:
+                return await respond(send, status, encode({'response': result}), headers)
+            fields['category'] = result.category
+            encoding, body, etag = result.variant(request_headers.get(b'accept-encoding', b'').decode('latin-1'))
+            headers = headers + answer_headers(encoding, etag) + [
+                (b'cache-control', f'public, max-age={chat_app.CHAT_HTTP_MAX_AGE}'.encode()),
+            ]
+            if etag_matches(request_headers.get(b'if-none-match', b'').decode('latin-1'), etag):
+                return await respond(send, 304, b'', headers)
+            count_saved(result, encoding, body)
+            return await respond(send, 200, body, headers)
+
+        content_type = request_headers.get(b'content-type', b'').split(b';')[0].strip().lower()
+        if content_type != b'application/json' and not (
+                content_type.startswith(b'application/') and content_type.endswith(b'+json')):
+            return await respond(send, 400, encode({'response': INVALID_REQUEST}), headers)
+
+        body = await read_body(receive)
+        if body is None:
+            return await respond(send, 400, encode({'response': INVALID_REQUEST}), headers)
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return await respond(send, 400, encode({'response': INVALID_REQUEST}), headers)
+
+        if isinstance(data, dict):
+            fields['language'] = data.get('language', 'en')
+        session_id = request_headers.get(b'x-session-id')
+        status, result = await answer(data, session_id and session_id.decode('latin-1'))
+        if status != 200:
+            return await respond(send, status, encode({'response': result}), headers)
+        fields['category'] = result.category
+        encoding, body, etag = result.variant(request_headers.get(b'accept-encoding', b'').decode('latin-1'))
+        count_saved(result, encoding, body)
+        return await respond(send, 200, body, headers + answer_headers(encoding, etag))
+
+    except Exception as e:
+        # Don't expose internal errors, but log them
+        fields['error'] = e
+        return await respond(send, 500, encode({'response': SERVER_ERROR}), headers)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            chat_app.warm_up()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+    if not chat_app.warmup['ready']:
+        # No lifespan startup event (uvicorn --lifespan off, say): warm up on
+        # the first request, off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, chat_app.warm_up)
+
+    request_headers = dict(scope['headers'])
+    headers = cors_headers(request_headers)
+    path, method = scope['path'], scope['method']
+
+    allowed = ROUTES.get(path)
+    if allowed is None:
+        return await respond(send, 404, encode({'response': 'Not found.'}), headers)
+    if method == 'OPTIONS':
+        # CORS preflight
+        requested = request_headers.get(b'access-control-request-headers')
+        preflight = headers + [(b'access-control-allow-methods', ', '.join(allowed + ('OPTIONS',)).encode())]
+        if requested:
+            preflight.append((b'access-control-allow-headers', requested))
+        return await respond(send, 200, b'', preflight, b'text/plain')
+    if method not in allowed:
+        return await respond(send, 405, encode({'response': 'Method not allowed.'}), headers)
+
+    if path == '/api/health':
+        body, extra = compressed(encode(chat_app.health_status()), request_headers)
+        return await respond(send, 200 if chat_app.warmup['ready'] else 503, body, headers + extra)
+
+    started = perf_counter()
+    fields = {}
+    status = await chat(scope, receive, send, request_headers, headers, fields)
+    elapsed = perf_counter() - started
+    error = fields.pop('error', None)
+    access_log = chat_app.access_log
+    if access_log is not None and access_log.wants(status, elapsed, error is not None):
+        access_log.request(method, path, status, elapsed, error, endpoint='chat', **fields)
@@ -0,0 +1,40 @@
+"""Bytes saved per category by the precompressed answer variants
+
+Run from the backend directory:
+
+    python benchmarks/compression_report.py [--language en]
+
+Lists every prepared answer with its plain JSON size and the size of each
+precompressed coding (brotli only when the brotli package is installed),
+largest first, then the totals.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import knowledge  # noqa: E402
+from responses import ENCODINGS  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--language', default='en')
+    args = parser.parse_args()
+
+    kb = knowledge.get(args.language).current
+    rows = sorted((dict(prepared.sizes(), category=category) for category, prepared in kb.responses.items()),
+                  key=lambda row: row['identity'], reverse=True)
+    header = f"{'category':<22} {'identity':>9}" + ''.join(f' {encoding:>7} {"saved":>6}' for encoding in ENCODINGS)
+    print(header)
+    for row in rows + [{'category': 'total', **kb.response_bytes()}]:
+        line = f"{row['category']:<22} {row['identity']:>9}"
+        for encoding in ENCODINGS:
+            size = row.get(encoding, row['identity'])
+            line += f' {size:>7} {1 - size / row["identity"]:>6.0%}'
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
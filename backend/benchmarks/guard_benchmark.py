@@ -0,0 +1,69 @@
+"""Worst-case timing for the input guard on adversarial messages
+
+Run from the backend directory:
+
+    python benchmarks/guard_benchmark.py
+
+Each family of inputs is built to provoke backtracking in the guard's
+patterns. The guard is timed at several lengths up to the 500 character
+limit; linear behaviour shows up as a flat time-per-character column.
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from guard import guard_message  # noqa: E402
+
+LENGTHS = [50, 100, 200, 300, 400, 500]
+REPEAT = 3
+
+
+def fill(unit, length):
+    return (unit * (length // len(unit) + 1))[:length]
+
+
+# name -> function producing an adversarial message of the given length
+FAMILIES = {
+    'plain text': lambda n: fill('tell me about your projects ', n),
+    'or + spaces': lambda n: 'or' + ' ' * (n - 2),
+    'or + digits': lambda n: 'or ' + '1' * (n - 3),
+    'or + digits + spaces': lambda n: 'or 1' + ' ' * (n - 4),
+    'repeated tautology prefix': lambda n: fill('or 1 ', n),
+    'event handler prefix': lambda n: 'on' + 'x' * (n - 2),
+    'event handler + spaces': lambda n: 'onx' + ' ' * (n - 3),
+    'repeated event prefix': lambda n: fill('onx ', n),
+    'repeated on': lambda n: fill('on', n),
+    'repeated on_': lambda n: fill('on_', n),
+    'repeated on + equals': lambda n: fill('on', n - 1) + '=',
+    'near-miss keywords': lambda n: fill('selec unio exe ', n),
+    'near-miss script tags': lambda n: fill('<scrip <ifram ', n),
+    'word characters': lambda n: 'a' * n,
+}
+
+
+def time_per_call(message):
+    timer = timeit.Timer(lambda: guard_message(message))
+    loops, _ = timer.autorange()
+    return min(timer.repeat(REPEAT, loops)) / loops
+
+
+def main():
+    header = f"{'input family':<28}" + ''.join(f'{n:>10}' for n in LENGTHS) + f"{'ratio':>8}"
+    print('ns per character by message length')
+    print(header)
+    print('-' * len(header))
+    worst = 0.0
+    for name, build in FAMILIES.items():
+        per_char = [time_per_call(build(n)) / n * 1e9 for n in LENGTHS]
+        # Time per character at 500 relative to 100; ~1 means linear
+        ratio = per_char[-1] / per_char[1]
+        worst = max(worst, ratio)
+        print(f'{name:<28}' + ''.join(f'{t:>10.1f}' for t in per_char) + f'{ratio:>8.2f}')
+    print()
+    print(f'worst growth of ns/char from 100 to 500 chars: {worst:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+"""HTTP load test and latency benchmark for /api/chat
+
+Run from the backend directory:
+
+    python benchmarks/loadtest.py [--server gunicorn] [--workers 2]
+                                  [--concurrency 8] [--duration 20]
+                                  [--rate-limit 0] [--output results.json]
+
+Starts the app locally, replays a realistic mix of questions and reports
+p50/p95/p99 latency, requests per second and error rates. Traffic mixes
+the example questions from the "help" and "default" answers, questions
+built from the qa_pairs keywords, and a slice of questions nothing
+matches. Rate limiting is off unless --rate-limit sets a per-window
+limit. Results are written as JSON (tagged with the git commit) so runs
+can be compared:
+
+    python benchmarks/loadtest.py --compare before.json after.json
+"""
+import argparse
+from collections import Counter
+import http.client
+import json
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+sys.path.insert(0, BACKEND_DIR)
+
+SERVERS = {
+    'gunicorn': lambda port, workers: [
+        sys.executable, '-m', 'gunicorn', '--workers', str(workers),
+        '--bind', f'127.0.0.1:{port}', 'app:app'],
+    'uvicorn': lambda port, workers: [
+        sys.executable, '-m', 'uvicorn', '--workers', str(workers), '--log-level', 'warning',
+        '--host', '127.0.0.1', '--port', str(port), 'asgi:app'],
+}
+
+UNMATCHED = [
+    'qwerty uiop', 'what is the weather like', 'lorem ipsum dolor',
+    'recommend a good movie', 'how tall is mount everest',
+]
+
+TEMPLATES = ['{}', 'tell me about {}', 'what about {}?', 'do you know {}', '{} please']
+
+
+def build_mix(seed):
+    """Return (weight, questions) pools drawn from the knowledge base"""
+    from app import knowledge
+
+    qa_pairs = knowledge.get('en').current.qa_pairs
+    quoted = re.compile(r'"([^"]+)"')
+    examples = []
+    for category in ('help', 'default'):
+        examples += quoted.findall(qa_pairs[category]["response"])
+
+    rng = random.Random(seed)
+    keyword_questions = [
+        rng.choice(TEMPLATES).format(keyword)
+        for data in qa_pairs.values()
+        for keyword in data["keywords"]
+    ]
+    return [(0.5, examples), (0.4, keyword_questions), (0.1, UNMATCHED)]
+
+
+def pick(mix, rng):
+    roll = rng.random()
+    for weight, pool in mix:
+        if roll < weight:
+            return rng.choice(pool)
+        roll -= weight
+    return rng.choice(mix[-1][1])
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(port, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/health')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('server did not start in time')
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def client(port, mix, seed, deadline, measure_from, samples, statuses, lock):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    local_samples, local_statuses = [], Counter()
+    while time.perf_counter() < deadline:
+        body = json.dumps({'message': pick(mix, rng), 'language': 'en'})
+        started = time.perf_counter()
+        try:
+            conn.request('POST', '/api/chat', body, {'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+            if response.getheader('Connection', '').lower() == 'close':
+                conn.close()
+        except (OSError, http.client.HTTPException):
+            status = 'error'
+            conn.close()
+        finished = time.perf_counter()
+        if started >= measure_from:
+            local_samples.append(finished - started)
+            local_statuses[status] += 1
+    with lock:
+        samples.extend(local_samples)
+        statuses.update(local_statuses)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    mix = build_mix(args.seed)
+    port = free_port()
+    env = dict(os.environ, RATE_LIMIT_MAX_REQUESTS=str(args.rate_limit or 10 ** 9))
+    server = subprocess.Popen(SERVERS[args.server](port, args.workers), cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    samples, statuses, lock = [], Counter(), threading.Lock()
+    try:
+        wait_until_up(port)
+        now = time.perf_counter()
+        measure_from = now + args.warmup
+        deadline = measure_from + args.duration
+        threads = [
+            threading.Thread(target=client, args=(port, mix, args.seed + i, deadline, measure_from,
+                                                  samples, statuses, lock))
+            for i in range(args.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    samples.sort()
+    total = sum(statuses.values())
+    errors = statuses.get('error', 0) + sum(count for status, count in statuses.items()
+                                             if status != 'error' and status >= 500)
+    ms = lambda value: round(value * 1000, 3) if value is not None else None  # noqa: E731
+    return {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'config': {
+            'server': args.server, 'workers': args.workers, 'concurrency': args.concurrency,
+            'duration': args.duration, 'warmup': args.warmup, 'rateLimit': args.rate_limit,
+            'seed': args.seed,
+        },
+        'requests': total,
+        'rps': round(total / args.duration, 1),
+        'latencyMs': {
+            'p50': ms(percentile(samples, 0.50)),
+            'p95': ms(percentile(samples, 0.95)),
+            'p99': ms(percentile(samples, 0.99)),
+            'mean': ms(sum(samples) / len(samples)) if samples else None,
+            'max': ms(samples[-1] if samples else None),
+        },
+        'statuses': {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        'errorRate': round(errors / total, 4) if total else None,
+        'rateLimitedRate': round(statuses.get(429, 0) / total, 4) if total else None,
+    }
+
+
+def report(result):
+    latency = result['latencyMs']
+    print(f"commit {result['commit']}  {result['config']}")
+    print(f"requests {result['requests']}  rps {result['rps']}")
+    print(f"latency ms  p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  "
+          f"mean {latency['mean']}  max {latency['max']}")
+    print(f"statuses {result['statuses']}  error rate {result['errorRate']}  "
+          f"rate-limited {result['rateLimitedRate']}")
+
+
+def compare(before_path, after_path):
+    with open(before_path) as before_file, open(after_path) as after_file:
+        before, after = json.load(before_file), json.load(after_file)
+    print(f"{'metric':<12}{before['commit'] or 'before':>14}{after['commit'] or 'after':>14}{'change':>10}")
+    rows = [('rps', before['rps'], after['rps'])]
+    rows += [(f'{key} ms', before['latencyMs'][key], after['latencyMs'][key])
+             for key in ('p50', 'p95', 'p99')]
+    rows.append(('error rate', before['errorRate'], after['errorRate']))
+    for name, old, new in rows:
+        change = f'{(new - old) / old * 100:+.1f}%' if old and new is not None else '-'
+        print(f'{name:<12}{old!s:>14}{new!s:>14}{change:>10}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--server', choices=sorted(SERVERS), default='gunicorn')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=2, help='unmeasured seconds first')
+    parser.add_argument('--rate-limit', type=int, default=0,
+                        help='requests per client per window; 0 disables rate limiting')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='JSON results path (default: benchmarks/results/)')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    result = run(args)
+    report(result)
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"loadtest-{result['commit'] or 'local'}-{int(time.time())}.json")
+    with open(output, 'w') as output_file:
+        json.dump(result, output_file, indent=2)
+    print(f'results written to {output}')
+
+
+if __name__ == '__main__':
+    main()
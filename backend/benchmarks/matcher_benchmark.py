@@ -0,0 +1,86 @@
+"""Build time and lookup latency of the matchers as the intent count grows
+
+Run from the backend directory:
+
+    python benchmarks/matcher_benchmark.py [--intents 100 1000 10000]
+
+The real qa_pairs are padded with synthetic intents, each listing a few
+keywords drawn from a shared vocabulary so common words appear in many
+intents, like "work" does in the real data. Every matcher is built once
+per size and timed on the same messages.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import knowledge  # noqa: E402
+from fuzzy import FuzzyMatcher, SymSpellIndex  # noqa: E402
+from matcher import KeywordMatcher, TokenIndexMatcher  # noqa: E402
+from retrieval import Bm25Matcher  # noqa: E402
+
+MATCHERS = {
+    'token': TokenIndexMatcher,
+    'keyword': KeywordMatcher,
+    'bm25': Bm25Matcher,
+    'fuzzy': lambda pairs: FuzzyMatcher(TokenIndexMatcher(pairs), SymSpellIndex.for_intents(pairs)),
+}
+
+MESSAGES = [
+    'hi',
+    'tell me about your work at teleperformance',
+    'what technologies do you use for machine learning projects',
+    'this message matches nothing at all',
+    'what ' * 100,
+    # Misspelled; only the fuzzy matcher places these
+    'experiance',
+    'what certifcation do you have',
+]
+
+
+def synthetic_intents(count, seed=0):
+    rng = random.Random(seed)
+    syllables = ['ka', 'lo', 'mi', 'ter', 'vo', 'san', 'dre', 'pu', 'zen', 'qua', 'bri', 'tok']
+    words = [''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(5000)]
+    pairs = dict(knowledge.get('en').current.qa_pairs)
+    default = pairs.pop('default')
+    for index in range(count - len(pairs)):
+        keywords = []
+        for _ in range(rng.randint(3, 12)):
+            # Zipf-like: a few words are shared by many intents
+            picked = [words[int(rng.paretovariate(1.2)) % len(words)] for _ in range(rng.randint(1, 3))]
+            keywords.append(' '.join(picked))
+        pairs[f'intent_{index}'] = {'keywords': keywords, 'response': ''}
+    pairs['default'] = default
+    return pairs
+
+
+def time_lookup(matcher, message):
+    timer = timeit.Timer(lambda: matcher.best_category(message))
+    loops, _ = timer.autorange()
+    return min(timer.repeat(3, loops)) / loops
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--intents', type=int, nargs='+', default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    print(f"{'intents':>8} {'matcher':<8} {'build ms':>10} {'mean us':>9} {'worst us':>9}")
+    for count in args.intents:
+        pairs = synthetic_intents(count)
+        for name, cls in MATCHERS.items():
+            started = time.perf_counter()
+            matcher = cls(pairs)
+            build = time.perf_counter() - started
+            timings = [time_lookup(matcher, message.lower()) for message in MESSAGES]
+            print(f'{count:>8} {name:<8} {build * 1e3:>10.1f} '
+                  f'{sum(timings) / len(timings) * 1e6:>9.1f} {max(timings) * 1e6:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
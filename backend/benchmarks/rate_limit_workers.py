@@ -0,0 +1,96 @@
+"""Check that the rate limit holds across every gunicorn worker
+
+Run from the backend directory:
+
+    python benchmarks/rate_limit_workers.py --workers 4 --requests 80
+
+Starts the app under gunicorn with several sync workers, fires concurrent
+requests from one client address and counts how many were allowed. With
+the shared-memory backend exactly MAX_REQUESTS get through no matter which
+worker served them; pass --backend memory to see the per-worker limit
+multiply instead. Exits non-zero when the global limit is not met.
+"""
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+
+from app import MAX_REQUESTS  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(port, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/health')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('gunicorn did not start in time')
+
+
+def post_chat(port):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    body = json.dumps({'message': 'who is gabriel', 'language': 'en'})
+    conn.request('POST', '/api/chat', body, {'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    response.read()
+    # Sync workers close the connection, so each request can land anywhere
+    return response.status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=80)
+    parser.add_argument('--backend', default='shm', choices=['memory', 'shm'])
+    args = parser.parse_args()
+
+    port = free_port()
+    env = dict(os.environ, RATE_LIMIT_BACKEND=args.backend)
+    with tempfile.TemporaryDirectory() as tmp:
+        env['RATE_LIMIT_SHM_PATH'] = os.path.join(tmp, 'ratelimit')
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--workers', str(args.workers),
+             '--bind', f'127.0.0.1:{port}', 'app:app'],
+            cwd=BACKEND_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_until_up(port)
+            with ThreadPoolExecutor(max_workers=args.workers * 4) as pool:
+                statuses = Counter(pool.map(post_chat, [port] * args.requests))
+        finally:
+            server.terminate()
+            server.wait()
+
+    allowed = statuses.get(200, 0)
+    print(f'backend={args.backend} workers={args.workers} requests={args.requests}')
+    print(f'status counts: {dict(statuses)}')
+    print(f'allowed {allowed}, global limit {MAX_REQUESTS}')
+    if allowed != MAX_REQUESTS:
+        print('FAIL: the limit was not enforced globally')
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
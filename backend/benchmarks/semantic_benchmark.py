@@ -0,0 +1,101 @@
+"""Accuracy of the vector fallback on paraphrased questions
+
+Run from the backend directory:
+
+    python benchmarks/semantic_benchmark.py [--thresholds 0.3 0.35 0.4]
+
+The questions below are worded differently from every keyword and example
+in knowledge_base.json, the way visitors actually ask. Each is labelled
+with the category it should reach, or None when the bot should fall back
+to its default answer. The current matcher (whole-word keywords with
+spelling correction) is compared with the same matcher backed by a
+VectorMatcher at each threshold; lookup latency and the size of the
+vector matrix are reported alongside.
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import knowledge  # noqa: E402
+from fuzzy import FuzzyMatcher, SymSpellIndex  # noqa: E402
+from matcher import FallbackMatcher, TokenIndexMatcher  # noqa: E402
+from retrieval import VectorMatcher  # noqa: E402
+
+QUESTIONS = [
+    ('who are we talking about', 'who_is_gabriel'),
+    ('introduce yourself please', 'who_is_gabriel'),
+    ('where have you been employed', 'experience'),
+    ('what positions have you held', 'experience'),
+    ('what did you create recently', 'projects'),
+    ('anything you built that i can look at', 'projects'),
+    ('what tools are in your stack', 'technologies'),
+    ('how could i reach out', 'contact'),
+    ('what is the best way to get in touch', 'contact'),
+    ('are you certified', 'certifications'),
+    ('which courses did you finish', 'certifications'),
+    ('where did you study', 'education'),
+    ('what degree are you taking', 'education'),
+    ('what are you strong at', 'skills'),
+    ('what are you proudest of', 'achievements'),
+    ('how long have you been programming', 'experience_years'),
+    ('have you done anything with neural nets', 'ai_projects'),
+    ('how do you verify your code is correct', 'testing_qa'),
+    ('which city do you live in', 'location'),
+    ('are you open to job offers', 'availability'),
+    ('could we hire you', 'availability'),
+    ('what do you charge', 'compensation'),
+    ('what salary are you expecting', 'compensation'),
+    ('what do you like doing in your free time', 'hobbies'),
+    ('can you work from anywhere', 'remote'),
+    ('which languages can you speak', 'spoken_languages'),
+    ('what can i ask this bot', 'help'),
+    ('how soon could you begin', 'timeline'),
+    ('what was the hardest problem you solved', 'challenges'),
+    ('how do you collaborate', 'teamwork'),
+    ('what are your plans for the future', 'goals'),
+    ('see ya', 'goodbye'),
+    ('appreciate it', 'thanks'),
+    # Nothing in the knowledge base answers these
+    ('what is the capital of france', None),
+    ('can you recommend a good pizza place', None),
+    ('how tall is mount everest', None),
+    ('qwerty asdf zxcv', None),
+]
+
+
+def accuracy(matcher):
+    hits = sum(matcher.best_category(question) == expected for question, expected in QUESTIONS)
+    wrong = sum(matcher.best_category(question) not in (expected, None) for question, expected in QUESTIONS)
+    return hits / len(QUESTIONS), wrong
+
+
+def mean_lookup(matcher):
+    timer = timeit.Timer(lambda: [matcher.best_category(question) for question, _ in QUESTIONS])
+    loops, _ = timer.autorange()
+    return min(timer.repeat(3, loops)) / loops / len(QUESTIONS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[0.3, 0.35, 0.4])
+    args = parser.parse_args()
+
+    pairs = knowledge.get('en').current.qa_pairs
+    current = FuzzyMatcher(TokenIndexMatcher(pairs), SymSpellIndex.for_intents(pairs))
+    candidates = {'current': current}
+    for threshold in args.thresholds:
+        vectors = VectorMatcher(pairs, threshold=threshold)
+        candidates[f'+vector {threshold:g}'] = FallbackMatcher(current, vectors)
+
+    print(f'{len(QUESTIONS)} questions, vector matrix {vectors.memory_bytes / 2 ** 20:.2f} MiB')
+    print(f"{'matcher':<14} {'accuracy':>9} {'wrong':>6} {'mean us':>8}")
+    for name, matcher in candidates.items():
+        correct, wrong = accuracy(matcher)
+        print(f'{name:<14} {correct:>9.1%} {wrong:>6} {mean_lookup(matcher) * 1e6:>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Memory per session and throughput of the session store
+
+Run from the backend directory:
+
+    python benchmarks/session_benchmark.py [--sessions 10000] [--turns 5]
+
+Fills a SessionStore with full sessions and reports the memory they hold,
+measured with tracemalloc and with the store's own estimate, then the
+cost of get() and record() and of writing the batch to SQLite. A second
+pass with a store a tenth the size shows evicted sessions being read back.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sessions import SessionStore  # noqa: E402
+
+CATEGORIES = ['projects', 'tala_project', 'technologies', 'contact', 'education', 'skills', 'experience']
+
+
+def fill(store, ids, turns):
+    for session_id in ids:
+        for turn in range(turns):
+            store.record(session_id, CATEGORIES[turn % len(CATEGORIES)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=10000)
+    parser.add_argument('--turns', type=int, default=5)
+    args = parser.parse_args()
+    ids = [str(uuid.uuid4()) for _ in range(args.sessions)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'sessions.db')
+        # Flushed by hand below, so no writer thread races the measurements
+        store = SessionStore(path, max_sessions=args.sessions, max_turns=args.turns, flush_interval=3600,
+                             batch_size=len(ids) * args.turns + 1)
+        store.ensure_flushing = lambda: None
+
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        fill(store, ids, args.turns * 2)
+        store._pending.clear()
+        traced = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(before, 'filename'))
+        tracemalloc.stop()
+        print(f'{len(store)} sessions of {args.turns} turns: '
+              f'{traced / len(store):.0f} bytes each traced, {store.memory_bytes() / len(store):.0f} estimated')
+
+        started = time.perf_counter()
+        for session_id in ids:
+            store.get(session_id)
+        get = (time.perf_counter() - started) / len(ids)
+        started = time.perf_counter()
+        fill(store, ids, 1)
+        record = (time.perf_counter() - started) / len(ids)
+        print(f'get {get * 1e6:.2f} us, record {record * 1e6:.2f} us')
+
+        started = time.perf_counter()
+        written = store.flush()
+        elapsed = time.perf_counter() - started
+        print(f'flush {written} sessions in {elapsed * 1e3:.1f} ms ({written / elapsed:,.0f} rows/s)')
+
+        small = SessionStore(path, max_sessions=len(ids) // 10, max_turns=args.turns)
+        started = time.perf_counter()
+        restored = sum(bool(small.get(session_id)) for session_id in ids)
+        elapsed = time.perf_counter() - started
+        print(f'store of {small.max_sessions}: {restored} sessions read back, '
+              f'{elapsed / len(ids) * 1e6:.1f} us each, {small.evictions} evicted, '
+              f'{small.memory_bytes() / 1024:.0f} KiB held')
+
+
+if __name__ == '__main__':
+    main()
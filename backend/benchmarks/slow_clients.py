@@ -0,0 +1,146 @@
+"""Compare how many slow clients the sync and async servers can hold open
+
+Run from the backend directory:
+
+    python benchmarks/slow_clients.py [--workers 2] [--steps 0,2,4,8,16,32,64]
+
+For each server model the script opens a growing number of connections
+that send a /api/chat request one byte at a time, then measures the
+latency of fast probe requests sent alongside them. Sync gunicorn workers
+are each tied up by one slow client, so probe latency collapses once the
+slow clients outnumber the workers; the ASGI app under uvicorn keeps
+answering. Rate limiting is switched off so it cannot skew the numbers.
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+BODY = json.dumps({'message': 'tell me about your projects', 'language': 'en'}).encode()
+REQUEST_HEAD = (
+    'POST /api/chat HTTP/1.1\r\nHost: localhost\r\n'
+    'Content-Type: application/json\r\n'
+    f'Content-Length: {len(BODY)}\r\nConnection: close\r\n\r\n'
+).encode()
+
+SERVERS = {
+    'gunicorn-sync': lambda port, workers: [
+        sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--timeout', '120',
+        '--bind', f'127.0.0.1:{port}', 'app:app'],
+    'uvicorn-asgi': lambda port, workers: [
+        sys.executable, '-m', 'uvicorn', '--workers', str(workers), '--log-level', 'warning',
+        '--host', '127.0.0.1', '--port', str(port), 'asgi:app'],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(port, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/health')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('server did not start in time')
+
+
+def slow_client(port, stop, interval):
+    """Trickle one request out a byte at a time until told to stop"""
+    try:
+        sock = socket.create_connection(('127.0.0.1', port))
+        sock.sendall(REQUEST_HEAD)
+        for byte in BODY:
+            if stop.wait(interval):
+                break
+            sock.send(bytes([byte]))
+        sock.close()
+    except OSError:
+        pass
+
+
+def probe(port, timeout):
+    started = time.perf_counter()
+    try:
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+        conn.request('POST', '/api/chat', BODY, {'Content-Type': 'application/json'})
+        ok = conn.getresponse().status == 200
+    except OSError:
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+def measure(port, slow_count, probes, timeout):
+    stop = threading.Event()
+    threads = [threading.Thread(target=slow_client, args=(port, stop, 0.5), daemon=True)
+               for _ in range(slow_count)]
+    for thread in threads:
+        thread.start()
+    # Let the slow clients get accepted before probing
+    time.sleep(0.5)
+    results = [probe(port, timeout) for _ in range(probes)]
+    stop.set()
+    for thread in threads:
+        thread.join()
+    latencies = sorted(latency for latency, ok in results if ok)
+    failures = sum(1 for _, ok in results if not ok)
+    return latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--steps', default='0,2,4,8,16,32,64')
+    parser.add_argument('--probes', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=3.0, help='probe timeout in seconds')
+    parser.add_argument('--threshold', type=float, default=0.5,
+                        help='median probe latency in seconds that counts as falling apart')
+    args = parser.parse_args()
+    steps = [int(step) for step in args.steps.split(',')]
+
+    env = dict(os.environ, RATE_LIMIT_MAX_REQUESTS='1000000000')
+    summary = {}
+    for name, command in SERVERS.items():
+        port = free_port()
+        server = subprocess.Popen(command(port, args.workers), cwd=BACKEND_DIR, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        held = 0
+        try:
+            wait_until_up(port)
+            print(f'\n{name} ({args.workers} workers)')
+            print(f"{'slow clients':>12} {'p50 ms':>9} {'max ms':>9} {'failed':>7}")
+            for slow_count in steps:
+                latencies, failures = measure(port, slow_count, args.probes, args.timeout)
+                p50 = statistics.median(latencies) if latencies else float('inf')
+                worst = latencies[-1] if latencies else float('inf')
+                print(f'{slow_count:>12} {p50 * 1000:>9.1f} {worst * 1000:>9.1f} {failures:>7}')
+                if failures or p50 > args.threshold:
+                    break
+                held = slow_count
+        finally:
+            server.terminate()
+            server.wait()
+        summary[name] = held
+
+    print('\nmost slow clients held open with healthy probe latency:')
+    for name, held in summary.items():
+        print(f'  {name}: {held}')
+
+
+if __name__ == '__main__':
+    main()
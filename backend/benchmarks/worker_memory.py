@@ -0,0 +1,127 @@
+"""Per-worker memory of gunicorn with and without preload
+
+Run from the backend directory (Linux only, it reads /proc):
+
+    python benchmarks/worker_memory.py [--workers 4] [--requests 200]
+
+Starts gunicorn once with GUNICORN_PRELOAD=false and once with preload,
+sends the same chat traffic to both, then reads every process's
+/proc/<pid>/smaps_rollup. RSS counts shared pages in full for every
+process; PSS splits them between the processes sharing them, and private
+memory (USS) is what each worker really adds, so those two show the
+saving.
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+MESSAGES = ['who is gabriel', 'tell me about your projects', 'what technologies do you use',
+            'how can i contact you', 'experiance', 'Gabriel是谁', 'sino si gabriel at ano ang ginagawa niya']
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/health')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError('gunicorn did not become ready in time')
+
+
+def post_chat(port, message):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    conn.request('POST', '/api/chat', json.dumps({'message': message}), {'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    response.read()
+    return response.status
+
+
+def children(pid):
+    found = []
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as stat:
+                    # The command name may contain spaces; ppid follows it
+                    if int(stat.read().rsplit(')', 1)[1].split()[1]) == pid:
+                        found.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    return found
+
+
+def memory(pid):
+    """RSS, PSS and private bytes of one process"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as rollup:
+        for line in rollup:
+            name, _, rest = line.partition(':')
+            if rest.strip().endswith('kB'):
+                values[name] = int(rest.split()[0]) * 1024
+    return values['Rss'], values['Pss'], values['Private_Clean'] + values['Private_Dirty']
+
+
+def measure(preload, workers, requests):
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, GUNICORN_PRELOAD=str(preload).lower(), RATE_LIMIT_MAX_REQUESTS='1000000',
+                   KB_SNAPSHOT_PATH=os.path.join(tmp, 'kb.snapshot'),
+                   CHAT_SESSION_DB=os.path.join(tmp, 'sessions.db'))
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--bind', f'127.0.0.1:{port}', 'app:app'],
+            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_until_ready(port)
+            while len(children(server.pid)) < workers:
+                time.sleep(0.1)
+            with ThreadPoolExecutor(max_workers=workers * 2) as pool:
+                list(pool.map(post_chat, [port] * requests, (MESSAGES * requests)[:requests]))
+            # Let post-request allocations settle before reading
+            time.sleep(0.5)
+            return memory(server.pid), [memory(pid) for pid in children(server.pid)]
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    mib = 1024 * 1024
+    print(f"{'mode':<10} {'process':<8} {'rss MiB':>8} {'pss MiB':>8} {'private MiB':>12}")
+    for preload in (False, True):
+        mode = 'preload' if preload else 'no preload'
+        master, workers = measure(preload, args.workers, args.requests)
+        print(f'{mode:<10} {"master":<8} {master[0] / mib:>8.1f} {master[1] / mib:>8.1f} {master[2] / mib:>12.1f}')
+        rss, pss, private = (sum(column) / len(workers) for column in zip(*workers))
+        print(f'{mode:<10} {"worker":<8} {rss / mib:>8.1f} {pss / mib:>8.1f} {private / mib:>12.1f}   (mean of {len(workers)})')
+        total = master[1] + sum(worker[1] for worker in workers)
+        print(f'{mode:<10} {"total":<8} {"":>8} {total / mib:>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
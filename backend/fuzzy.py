@@ -0,0 +1,167 @@
+"""Typo-tolerant keyword lookup with a symmetric-delete index
+
+Every keyword word is indexed under all the strings left after deleting up
+to max_distance characters from it. A misspelled word is looked up the
+same way: its own deletes are generated and each one is a single dict
+lookup, and the words that come back are the only candidates whose edit
+distance is ever computed. No scan over the vocabulary happens at query
+time, so a correction costs the same with ten keywords or ten thousand.
+"""
+from matcher import words
+
+# Everyday words that are spelled right even though no keyword uses them;
+# without these "there" would be "corrected" to the keyword "where"
+COMMON_WORDS = frozenset("""
+    about after again also always because been before being best both came
+    come could does doing done each even every find first from give going
+    good great have here into just know last like little long look made make
+    many more most much must need never only other over please really right
+    same should show some something still such take than thank that their
+    them then there these they thing think this those through time very want
+    well were what when where which while will with work would your yours
+""".split())
+
+
+def _deletes(word, max_distance):
+    """Every string left after deleting up to max_distance characters"""
+    found = {word}
+    edge = {word}
+    for _ in range(max_distance):
+        edge = {candidate[:index] + candidate[index + 1:]
+                for candidate in edge if len(candidate) > 1
+                for index in range(len(candidate))}
+        found |= edge
+    return found
+
+
+def edit_distance(first, second, limit):
+    """Optimal string alignment distance, or limit + 1 once it exceeds limit"""
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    # Shared ends cost nothing; a typo usually leaves only a few letters
+    start = 0
+    while start < len(first) and start < len(second) and first[start] == second[start]:
+        start += 1
+    end = 0
+    while (end < len(first) - start and end < len(second) - start
+           and first[-1 - end] == second[-1 - end]):
+        end += 1
+    first, second = first[start:len(first) - end], second[start:len(second) - end]
+    if not first or not second:
+        return min(max(len(first), len(second)), limit + 1)
+
+    previous_previous = None
+    previous = list(range(len(second) + 1))
+    for i in range(1, len(first) + 1):
+        current = [i] + [0] * len(second)
+        row_best = i
+        for j in range(1, len(second) + 1):
+            cost = first[i - 1] != second[j - 1]
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (i > 1 and j > 1 and first[i - 1] == second[j - 2]
+                    and first[i - 2] == second[j - 1]):
+                # A swap of two neighbouring letters is one edit
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            row_best = min(row_best, value)
+        if row_best > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class SymSpellIndex:
+    """Correct misspelled words against the keyword vocabulary
+
+    Words shorter than min_length, and common words, are never corrected;
+    there are too many real words one edit away from "hi" or "js". Longer
+    words may be up to one edit off, and words of long_length or more up
+    to max_distance.
+    Only the first prefix_length characters are indexed, which bounds the
+    number of deletes per word; candidates are still checked in full.
+    """
+
+    def __init__(self, vocabulary, max_distance=2, min_length=4, long_length=8, prefix_length=7,
+                 known_words=COMMON_WORDS):
+        self.known_words = known_words
+        self.max_distance = max_distance
+        self.min_length = min_length
+        self.long_length = long_length
+        self.prefix_length = prefix_length
+        # word -> number of keywords using it, which breaks ties
+        self.vocabulary = dict(vocabulary)
+        self._deletes = {}
+        for word in self.vocabulary:
+            if len(word) < min_length:
+                continue
+            for deleted in _deletes(word[:prefix_length], max_distance):
+                self._deletes.setdefault(deleted, []).append(word)
+        self._deletes = {deleted: tuple(found) for deleted, found in self._deletes.items()}
+        self.delete_count = len(self._deletes)
+
+    @classmethod
+    def for_intents(cls, qa_pairs, segmenter=None, **options):
+        vocabulary = {}
+        for data in qa_pairs.values():
+            for keyword in data["keywords"]:
+                for word in set(words(keyword.lower(), segmenter)):
+                    if word.isalpha() and word.isascii():
+                        vocabulary[word] = vocabulary.get(word, 0) + 1
+        return cls(vocabulary, **options)
+
+    def lookup(self, word):
+        """Return the closest vocabulary word, or None"""
+        if word in self.vocabulary or word in self.known_words or len(word) < self.min_length:
+            return None
+        limit = 1 if len(word) < self.long_length else self.max_distance
+        limit = min(limit, self.max_distance)
+        best = None
+        best_key = None
+        seen = set()
+        for deleted in _deletes(word[:self.prefix_length], limit):
+            for candidate in self._deletes.get(deleted, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                distance = edit_distance(word, candidate, limit)
+                if distance > limit:
+                    continue
+                key = (distance, -self.vocabulary[candidate], candidate)
+                if best_key is None or key < best_key:
+                    best, best_key = candidate, key
+        return best
+
+    def correct(self, text, segmenter=None):
+        """Return text with misspelled words replaced, or None if none were"""
+        tokens = words(text, segmenter)
+        corrected = False
+        for index, token in enumerate(tokens):
+            if token.isalpha() and token.isascii():
+                replacement = self.lookup(token)
+                if replacement is not None:
+                    tokens[index] = replacement
+                    corrected = True
+        return ' '.join(tokens) if corrected else None
+
+
+class FuzzyMatcher:
+    """A matcher that retries with corrected spelling when nothing matched
+
+    Exact matching always runs first, so well-spelled messages are answered
+    exactly as before and only misses pay for the correction.
+    """
+
+    def __init__(self, matcher, index, segmenter=None):
+        self.matcher = matcher
+        self.index = index
+        self.segmenter = segmenter
+        self.categories = matcher.categories
+
+    def best_category(self, text, boost=()):
+        best = self.matcher.best_category(text, boost)
+        if best is not None:
+            return best
+        corrected = self.index.correct(text, self.segmenter)
+        if corrected is None:
+            return None
+        return self.matcher.best_category(corrected, boost)
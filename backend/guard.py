@@ -0,0 +1,78 @@
+from dataclasses import dataclass
+import html
+import re
+
+MAX_MESSAGE_LENGTH = 500
+
+# Every SQL injection and XSS rule in one alternation, so a message is
+# scanned once instead of once per pattern. The quantified runs (\s, \d, \w)
+# are followed by characters outside their own class, which keeps the
+# backtracking at each start position bounded by the run it just read and
+# the whole search linear in the length of the message.
+_reject_re = re.compile(
+    # SQL keywords
+    r'\b(?:SELECT|INSERT|UPDATE|DELETE|DROP|CREATE|ALTER|EXEC|EXECUTE)\b'
+    # Tautologies such as "OR 1=1"
+    r'|\b(?:UNION|OR|AND)\s+\d+\s*=\s*\d'
+    # Quotes, statement separators and comments
+    r'|[\'";]|--|/\*|\*/'
+    # Script injection
+    r'|<script|javascript:|onerror=|onload=|<iframe|<object|<embed',
+    re.IGNORECASE
+)
+
+# Event handler attributes left over after escaping: a run of word characters
+# containing "on" and followed by "=". Matching starts only at the beginning
+# of a run and takes all of it, so each character is read a bounded number
+# of times; searching for "on\w+" directly would rescan the rest of the run
+# from every "on" in it ("ononon...").
+_assignment_re = re.compile(r'(?<!\w)\w+\s*=')
+_event_prefix_re = re.compile(r'on\w', re.IGNORECASE)
+
+
+def _strip_event_handler(match):
+    """Drop an assignment from its first "on" on, keeping the text before it"""
+    run = match.group()
+    found = _event_prefix_re.search(run)
+    return run if found is None else run[:found.start()]
+
+
+@dataclass(frozen=True)
+class NormalizedMessage:
+    """A validated message, sanitized and lowercased exactly once"""
+    text: str
+    lowered: str
+
+
+def validate_input(text):
+    """Validate input format"""
+    if not text or not isinstance(text, str):
+        return False
+    return _reject_re.search(text) is None
+
+
+def sanitize_input(text):
+    """Sanitize user input to prevent XSS and injection attacks"""
+    if not text:
+        return ""
+
+    # Escaping leaves no '<', so script tags cannot survive this step
+    text = html.escape(text)
+    text = _assignment_re.sub(_strip_event_handler, text)
+
+    # Limit length
+    return text[:MAX_MESSAGE_LENGTH].strip()
+
+
+def guard_message(text):
+    """Validate and normalize a message, or return None if it is rejected
+
+    Only the first MAX_MESSAGE_LENGTH characters are read; sanitizing would
+    cut the rest anyway, and it keeps the cost bounded for any input.
+    """
+    if isinstance(text, str):
+        text = text[:MAX_MESSAGE_LENGTH]
+    if not validate_input(text):
+        return None
+    sanitized = sanitize_input(text)
+    return NormalizedMessage(sanitized, sanitized.lower())
@@ -0,0 +1,67 @@
+"""gunicorn settings, read automatically when gunicorn starts in this directory
+
+    gunicorn app:app
+
+With preload (the default) the master imports the app once, builds every
+knowledge base, index and prepared response, warms the hot path and only
+then forks the workers, which share those pages copy-on-write instead of
+each building its own copy. Following the gc module's advice for forking
+servers, the collector is off while the master loads, so no collection
+leaves freed holes in pages the workers will share, and everything alive
+is frozen into the permanent generation right before the fork, so the
+workers' collections never write to the headers of shared objects.
+
+GUNICORN_PRELOAD=false loads the app in every worker instead, which each
+warm up before serving. /api/health answers 503 until warm-up is done.
+
+Metrics are always aggregated over the workers: without METRICS_DIR the
+master makes a private directory for this run and removes it on exit, and
+a configured directory is cleared of the previous run's files.
+"""
+import gc
+import glob
+import os
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes')
+
+if preload_app:
+    gc.disable()
+
+# Read by app.py in the master or the workers, which inherit the environment
+if os.environ.get('METRICS_DIR'):
+    metrics_dir = None
+    os.makedirs(os.environ['METRICS_DIR'], exist_ok=True)
+    for stale in glob.glob(os.path.join(os.environ['METRICS_DIR'], 'metrics_*.db')):
+        os.unlink(stale)
+else:
+    metrics_dir = os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='portfolio-chat-metrics-')
+
+
+def when_ready(server):
+    # The master has loaded the app and is about to fork the first workers
+    if preload_app:
+        import app
+        app.warm_up()
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    # Threads, connections and per-process files are reopened lazily by pid;
+    # only the collector needs turning back on
+    if preload_app:
+        gc.enable()
+
+
+def post_worker_init(worker):
+    if not preload_app:
+        import app
+        app.warm_up()
+
+
+def on_exit(server):
+    if metrics_dir is not None:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
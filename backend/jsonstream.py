@@ -0,0 +1,77 @@
+import codecs
+import json
+
+_decoder = json.JSONDecoder()
+_whitespace = ' \t\n\r'
+
+
+def iter_json_array(stream, chunk_size=8192, max_item_size=65536):
+    """Yield the elements of a JSON array read incrementally from stream
+
+    Only the element being decoded is buffered, so arbitrarily long arrays
+    are parsed in constant memory. Raises ValueError on malformed input,
+    including anything but whitespace after the closing bracket, or on a
+    single element larger than max_item_size characters.
+    """
+    decode = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    eof = False
+
+    def fill():
+        nonlocal buffer, eof
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+            buffer += decode.decode(b'', final=True)
+        else:
+            buffer += decode.decode(chunk)
+        if len(buffer) > max_item_size:
+            raise ValueError('array element too large')
+
+    def next_char():
+        """Drop leading whitespace and return the next character, or ''"""
+        nonlocal buffer
+        while True:
+            buffer = buffer.lstrip(_whitespace)
+            if buffer or eof:
+                return buffer[:1]
+            fill()
+
+    def finish():
+        """Check that nothing but whitespace follows the closing bracket"""
+        if next_char():
+            raise ValueError('unexpected data after JSON array')
+
+    if next_char() != '[':
+        raise ValueError('expected a JSON array')
+    buffer = buffer[1:]
+    if next_char() == ']':
+        buffer = buffer[1:]
+        finish()
+        return
+
+    while True:
+        if not next_char():
+            raise ValueError('unterminated JSON array')
+        try:
+            value, end = _decoder.raw_decode(buffer)
+            # A value that reaches the end of the buffer (a number, say)
+            # may continue in the next chunk
+            complete = end < len(buffer) or eof
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+        if not complete:
+            fill()
+            continue
+        buffer = buffer[end:]
+        yield value
+
+        separator = next_char()
+        buffer = buffer[1:]
+        if separator == ']':
+            finish()
+            return
+        if separator != ',':
+            raise ValueError('expected "," or "]" in JSON array')
@@ -0,0 +1,386 @@
+"""The chatbot's intents: loaded from a data file, compiled and hot-reloaded
+
+Intents live in a JSON file (or YAML, when PyYAML is installed) mapping each
+category to its keywords, response and optional example questions and
+related categories. Other languages get overlay files next to it
+(knowledge_base.zh.json) that add keywords in that language and may replace
+responses; their knowledge bases are built on first use. Compiling them
+builds the match index and the prepared responses; the result is also
+written to a binary snapshot keyed by a hash of the file and of the
+source of the modules that compile it, so later starts with the same file
+and code unpickle the index instead of rebuilding it.
+
+Each process polls the file in a background thread. A change is compiled
+off to the side and published by replacing one attribute, so a request
+always sees a single consistent knowledge base, old or new, and none are
+dropped while a reload is in progress. A file that fails to load leaves the
+current knowledge base in place.
+
+Snapshots are trusted pickles: keep them in a directory only this service
+can write to. As a second line of defence a snapshot is only unpickled if
+this user owns it and nobody else can write to it.
+"""
+from dataclasses import dataclass
+from time import perf_counter
+from types import MappingProxyType
+import hashlib
+import importlib.util
+import json
+import os
+import pickle
+import stat
+import tempfile
+import threading
+import time
+
+SNAPSHOT_MAGIC = b'KBv3'
+
+
+class KnowledgeBaseError(ValueError):
+    """The intents file is unreadable or malformed"""
+
+
+def language_path(path, language, default='en'):
+    """Path of the per-language variant of a file: kb.json -> kb.zh.json"""
+    if language == default:
+        return path
+    root, extension = os.path.splitext(path)
+    return f'{root}.{language}{extension}'
+
+
+def parse_intents(path, data, overlay=False):
+    """Parse and check the raw contents of an intents file
+
+    An overlay may leave out "default" and any response.
+    """
+    if path.endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError:
+            raise KnowledgeBaseError(f'PyYAML is needed to read {path}') from None
+        try:
+            intents = yaml.safe_load(data)
+        except yaml.YAMLError as error:
+            raise KnowledgeBaseError(f'{path}: {error}') from None
+    else:
+        try:
+            intents = json.loads(data)
+        except ValueError as error:
+            raise KnowledgeBaseError(f'{path}: {error}') from None
+
+    if not isinstance(intents, dict) or not (overlay or "default" in intents):
+        raise KnowledgeBaseError(f'{path}: expected an object of categories including "default"')
+    for category, data in intents.items():
+        if (not isinstance(data, dict)
+                or not isinstance(data.get("response", "" if overlay else None), str)
+                or not isinstance(data.get("keywords"), list)
+                or not all(isinstance(keyword, str) for keyword in data["keywords"])):
+            raise KnowledgeBaseError(f'{path}: category {category!r} needs a "keywords" list and a "response"')
+        for field in ("examples", "related"):
+            listed = data.get(field, [])
+            if not isinstance(listed, list) or not all(isinstance(item, str) for item in listed):
+                raise KnowledgeBaseError(f'{path}: {field!r} of category {category!r} must be a list of strings')
+        if not overlay:
+            unknown = [name for name in data.get("related", []) if name not in intents]
+            if unknown:
+                raise KnowledgeBaseError(f'{path}: category {category!r} is related to unknown {unknown!r}')
+    return intents
+
+
+def merge_intents(base, overlay):
+    """Add an overlay's keywords to the base intents and apply its responses
+
+    Base keywords stay, so messages mixing languages still match; an
+    overlay's "related" list replaces the base one. Categories only in the
+    overlay are appended after the base ones.
+    """
+    merged = {}
+    for category, data in base.items():
+        extra = overlay.get(category, {})
+        merged[category] = {
+            "keywords": extra.get("keywords", []) + data["keywords"],
+            "examples": extra.get("examples", []) + data.get("examples", []),
+            "related": extra.get("related", data.get("related", [])),
+            "response": extra.get("response", data["response"]),
+        }
+    for category, data in overlay.items():
+        if category not in merged:
+            if "response" not in data:
+                raise KnowledgeBaseError(f'category {category!r} is new in an overlay and needs a "response"')
+            merged[category] = {
+                "keywords": list(data["keywords"]),
+                "examples": list(data.get("examples", [])),
+                "related": list(data.get("related", [])),
+                "response": data["response"],
+            }
+    return merged
+
+
+@dataclass(frozen=True)
+class KnowledgeBase:
+    """One compiled version of the intents file"""
+    version: str
+    qa_pairs: dict
+    matcher: object
+    responses: MappingProxyType
+    # "build" when compiled now, "snapshot" when read back from disk
+    source: str
+    build_seconds: float
+    load_seconds: float
+    index_bytes: int
+    loaded_at: float
+
+    def response_bytes(self):
+        """Total size of the prepared answers per content coding"""
+        totals = {}
+        for prepared in self.responses.values():
+            for encoding, size in prepared.sizes().items():
+                totals[encoding] = totals.get(encoding, 0) + size
+        return totals
+
+    def stats(self):
+        return {
+            'version': self.version,
+            'intents': len(self.qa_pairs),
+            'source': self.source,
+            'buildMs': round(self.build_seconds * 1000, 3),
+            'loadMs': round(self.load_seconds * 1000, 3),
+            'indexBytes': self.index_bytes,
+            'responseBytes': self.response_bytes(),
+            'loadedAt': self.loaded_at,
+        }
+
+
+def source_fingerprint(modules):
+    """Hash of the source files of the named modules, found without importing them"""
+    digest = hashlib.sha256()
+    for name in sorted(set(modules)):
+        spec = importlib.util.find_spec(name)
+        digest.update(name.encode('utf-8') + b'\0')
+        if spec is not None and spec.origin and os.path.isfile(spec.origin):
+            with open(spec.origin, 'rb') as source:
+                data = source.read()
+            digest.update(b'%d\0' % len(data) + data)
+    return digest.digest()
+
+
+def _private_file(status):
+    """Whether a file belongs to this user and only it may write to it"""
+    if hasattr(os, 'getuid') and status.st_uid != os.getuid():
+        return False
+    return not status.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+class KnowledgeBaseStore:
+    """Holds the current knowledge base and reloads it when the file changes
+
+    build(qa_pairs) returns the (matcher, responses) pair for a set of
+    intents, read from path and merged with each overlay path in turn.
+    variant names everything else that shapes the compiled result, such as
+    the matcher in use, and code the modules whose classes and functions
+    build it, so snapshots made with a different setup or an older version
+    of the code are never reused.
+    """
+
+    def __init__(self, path, build, variant='', snapshot_path=None, poll_interval=2.0, on_swap=None,
+                 overlays=(), code=()):
+        self.path = path
+        self.overlays = tuple(overlays)
+        self.variant = variant
+        self.code = (__name__,) + tuple(code)
+        self._code_digest = source_fingerprint(self.code)
+        self.snapshot_path = snapshot_path
+        self.poll_interval = poll_interval
+        self._build = build
+        self._on_swap = on_swap
+        self._lock = threading.Lock()
+        self._watch_pid = None
+        self._stamp = None
+        self.reloads = 0
+        self.errors = 0
+        self.last_error = None
+        self.current = None
+        self.current = self._load()
+
+    def _file_stamp(self):
+        stamp = ()
+        for path in (self.path,) + self.overlays:
+            status = os.stat(path)
+            stamp += (status.st_mtime_ns, status.st_size)
+        return stamp
+
+    def _load(self):
+        started = perf_counter()
+        stamp = self._file_stamp()
+        contents = []
+        digest = hashlib.sha256(b'%s\0%s\0%s' % (SNAPSHOT_MAGIC, self.variant.encode('utf-8'), self._code_digest))
+        for path in (self.path,) + self.overlays:
+            with open(path, 'rb') as source:
+                data = source.read()
+            contents.append((path, data))
+            digest.update(b'%d\0' % len(data) + data)
+        digest = digest.digest()
+        version = digest.hex()[:16]
+        if self.current is not None and self.current.version == version:
+            self._stamp = stamp
+            return self.current
+
+        loaded = self._read_snapshot(digest)
+        if loaded is not None:
+            (qa_pairs, matcher, responses, build_seconds), index_bytes = loaded
+            source = 'snapshot'
+        else:
+            (path, data), *overlays = contents
+            qa_pairs = parse_intents(path, data)
+            for path, data in overlays:
+                qa_pairs = merge_intents(qa_pairs, parse_intents(path, data, overlay=True))
+            matcher, responses = self._build(qa_pairs)
+            responses = dict(responses)
+            build_seconds = perf_counter() - started
+            index_bytes = self._write_snapshot(digest, (qa_pairs, matcher, responses, build_seconds))
+            source = 'build'
+
+        self._stamp = stamp
+        return KnowledgeBase(
+            version, qa_pairs, matcher, MappingProxyType(responses), source,
+            build_seconds, perf_counter() - started, index_bytes, time.time(),
+        )
+
+    def _read_snapshot(self, digest):
+        if not self.snapshot_path:
+            return None
+        try:
+            with open(self.snapshot_path, 'rb') as snapshot:
+                # Checked on the open file, so it cannot be swapped after the check
+                if not _private_file(os.fstat(snapshot.fileno())):
+                    return None
+                header = snapshot.read(len(SNAPSHOT_MAGIC) + len(digest))
+                if header != SNAPSHOT_MAGIC + digest:
+                    return None
+                payload = snapshot.read()
+            return pickle.loads(payload), len(payload)
+        except Exception:
+            # Missing, stale or unreadable: rebuild and overwrite it
+            return None
+
+    def _write_snapshot(self, digest, compiled):
+        payload = pickle.dumps(compiled, protocol=pickle.HIGHEST_PROTOCOL)
+        if not self.snapshot_path:
+            return len(payload)
+        temporary = None
+        try:
+            directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            fd, temporary = tempfile.mkstemp(dir=directory, prefix='.kb-')
+            with os.fdopen(fd, 'wb') as snapshot:
+                snapshot.write(SNAPSHOT_MAGIC + digest + payload)
+            # Readers see the old snapshot or the new one, never a partial file
+            os.replace(temporary, self.snapshot_path)
+        except OSError:
+            # A snapshot only speeds up the next start; serving goes on
+            if temporary is not None and os.path.exists(temporary):
+                os.unlink(temporary)
+        return len(payload)
+
+    def reload(self):
+        """Load the file again and publish it if it changed
+
+        Returns True when a new knowledge base was swapped in.
+        """
+        with self._lock:
+            previous = self.current
+            try:
+                loaded = self._load()
+            except Exception as error:
+                # Keep serving the last good version and wait for the next edit
+                self.errors += 1
+                self.last_error = str(error)
+                try:
+                    self._stamp = self._file_stamp()
+                except OSError:
+                    pass
+                return False
+            if loaded is previous:
+                return False
+            # A single reference assignment: readers never see a mix
+            self.current = loaded
+            self.reloads += 1
+            self.last_error = None
+        if self._on_swap is not None:
+            self._on_swap(previous, loaded)
+        return True
+
+    def check(self):
+        """Reload when the file's modification time or size changed"""
+        try:
+            stamp = self._file_stamp()
+        except OSError as error:
+            self.errors += 1
+            self.last_error = str(error)
+            return False
+        if stamp == self._stamp:
+            return False
+        return self.reload()
+
+    def ensure_watching(self):
+        """Start this process's watcher thread if it is not running yet
+
+        Threads do not survive a fork, so every worker starts its own on
+        first use.
+        """
+        if self._watch_pid == os.getpid() or not self.poll_interval:
+            return
+        with self._lock:
+            if self._watch_pid == os.getpid():
+                return
+            self._watch_pid = os.getpid()
+        threading.Thread(target=self._watch, name='knowledge-base-watcher', daemon=True).start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            self.check()
+
+    def stats(self):
+        return dict(
+            self.current.stats(),
+            path=self.path,
+            overlays=list(self.overlays),
+            reloads=self.reloads,
+            reloadErrors=self.errors,
+            lastError=self.last_error,
+        )
+
+
+class KnowledgeBases:
+    """One store per language, opened on first use and shared afterwards
+
+    open_store(language, on_swap) creates the store for a language; it may
+    return the store of another language to share it. generation changes
+    whenever any store swaps in a new version, so it can tag cached answers.
+    """
+
+    def __init__(self, open_store, on_swap=None):
+        self._open_store = open_store
+        self._on_swap = on_swap
+        self._stores = {}
+        self._lock = threading.RLock()
+        self.generation = 0
+
+    def _swapped(self, previous, current):
+        with self._lock:
+            self.generation += 1
+        if self._on_swap is not None:
+            self._on_swap(previous, current)
+
+    def get(self, language):
+        store = self._stores.get(language)
+        if store is None:
+            with self._lock:
+                store = self._stores.get(language)
+                if store is None:
+                    store = self._stores[language] = self._open_store(language, self._swapped)
+        return store
+
+    def stats(self):
+        return {language: store.stats() for language, store in list(self._stores.items())}
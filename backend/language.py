@@ -0,0 +1,164 @@
+"""Language detection and Chinese word segmentation for chat messages
+
+The detector is deliberately small: Chinese is recognized by its script,
+and English and Tagalog, which share the Latin alphabet, by character
+trigram frequencies learned from the short samples below. It only answers
+when the evidence is clear, so a one-word message keeps the language the
+client declared.
+"""
+from itertools import repeat
+from math import log
+import re
+
+SUPPORTED_LANGUAGES = ('en', 'tl', 'zh')
+DEFAULT_LANGUAGE = 'en'
+
+# CJK unified ideographs, extension A and compatibility ideographs
+CJK_RANGES = '㐀-䶿一-鿿豈-﫿'
+_cjk_re = re.compile(f'[{CJK_RANGES}]')
+_letter_re = re.compile(r'[^\W\d_]')
+_latin_word_re = re.compile(r'[a-z]+')
+
+SAMPLES = {
+    'en': """
+        who is gabriel and what does he do? tell me about your experience,
+        your projects and the technologies you use. what are your skills and
+        certifications? how can i contact you or send you an email? where do
+        you work and where did you study? are you available for hire or for
+        remote work? thank you for the help, that was very useful. show me the
+        portfolio and the things you have built with python and react. what
+        is your education and what are your goals for the future? good
+        morning, hello there, have a nice day and goodbye.
+    """,
+    'tl': """
+        sino si gabriel at ano ang ginagawa niya? ano ang karanasan mo sa
+        trabaho at ang mga proyekto mo? anong mga teknolohiya ang ginagamit
+        mo? ano ang mga kakayahan at sertipiko mo? paano kita makokontak o
+        mapapadalhan ng email? saan ka nagtatrabaho at saan ka nag-aral?
+        pwede ba kitang kunin para sa isang trabaho? maraming salamat sa
+        tulong mo, napakalaking tulong nito. ipakita mo sa akin ang mga
+        ginawa mo gamit ang python at react. ano ang mga layunin mo sa
+        hinaharap? magandang umaga, kumusta ka na, paalam at ingat ka palagi.
+    """,
+}
+
+
+def normalize_language(language):
+    """Map a declared language tag such as "zh-CN" onto a supported code"""
+    if not isinstance(language, str):
+        return None
+    primary = language.strip().lower().replace('_', '-').split('-')[0]
+    if primary == 'fil':
+        primary = 'tl'
+    return primary if primary in SUPPORTED_LANGUAGES else None
+
+
+def _trigrams(text, limit):
+    """The first limit character trigrams of the words in text"""
+    trigrams = []
+    for match in _latin_word_re.finditer(text):
+        padded = f' {match.group()} '
+        trigrams += [padded[start:start + 3] for start in range(len(padded) - 2)]
+        if len(trigrams) >= limit:
+            return trigrams[:limit]
+    return trigrams
+
+
+class LanguageDetector:
+    """Guess the language of a lowercased message, or None when unsure"""
+
+    def __init__(self, samples=SAMPLES, min_trigrams=8, max_trigrams=64, min_margin=0.35, cjk_share=0.3):
+        self.min_trigrams = min_trigrams
+        self.max_trigrams = max_trigrams
+        self.min_margin = min_margin
+        self.cjk_share = cjk_share
+        self._profiles = {}
+        self._unseen = {}
+        for language, sample in samples.items():
+            counts = {}
+            for trigram in _trigrams(sample.lower(), len(sample)):
+                counts[trigram] = counts.get(trigram, 0) + 1
+            # Add-one smoothing; unseen trigrams cost the same everywhere
+            total = sum(counts.values()) + len(counts) + 1
+            self._profiles[language] = {trigram: log((count + 1) / total) for trigram, count in counts.items()}
+            self._unseen[language] = log(1 / total)
+
+    def detect(self, text):
+        cjk = len(_cjk_re.findall(text))
+        if cjk and cjk / len(_letter_re.findall(text)) >= self.cjk_share:
+            return 'zh'
+
+        # The first few dozen trigrams settle it; longer text adds no signal
+        trigrams = _trigrams(text, self.max_trigrams)
+        count = len(trigrams)
+        if count < self.min_trigrams:
+            return None
+        scores = {
+            language: sum(map(profile.get, trigrams, repeat(self._unseen[language])))
+            for language, profile in self._profiles.items()
+        }
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        if (scores[ranked[0]] - scores[ranked[1]]) / count < self.min_margin:
+            return None
+        return ranked[0]
+
+
+def resolve_language(declared, text, detector):
+    """Pick the knowledge base language for a message
+
+    The declared language wins unless the detector is confident the text
+    is in another supported language; unknown or missing declarations fall
+    back to what the text looks like, then to English.
+    """
+    declared = normalize_language(declared)
+    detected = detector.detect(text)
+    if detected is not None and detected != declared:
+        return detected
+    return declared or DEFAULT_LANGUAGE
+
+
+# Frequent words that rarely appear in keywords, so that segmentation finds
+# sensible boundaries around the ones that do
+COMMON_CHINESE_WORDS = (
+    '你好', '你们', '我们', '他们', '什么', '怎么', '怎样', '为什么', '哪里', '哪些',
+    '哪个', '可以', '能够', '如何', '关于', '一下', '告诉', '现在', '以前', '还是',
+    '没有', '知道', '喜欢', '是否', '已经', '一些', '所有', '非常', '谢谢', '请问',
+)
+
+
+class ChineseSegmenter:
+    """Forward maximum matching over a dictionary of known words
+
+    At each position the longest dictionary word starting there is taken;
+    characters that start no known word become one-character tokens.
+    Keywords are in the dictionary, so a keyword is always one token, and
+    because the longest word wins, "在哪里工作" is not also read as "在哪里".
+    """
+
+    def __init__(self, words):
+        self.words = frozenset(word for word in words if word)
+        self.max_length = max((len(word) for word in self.words), default=1)
+
+    def segment(self, text):
+        words, max_length = self.words, self.max_length
+        tokens = []
+        start = 0
+        while start < len(text):
+            for end in range(min(len(text), start + max_length), start + 1, -1):
+                if text[start:end] in words:
+                    break
+            else:
+                end = start + 1
+            tokens.append(text[start:end])
+            start = end
+        return tokens
+
+    @classmethod
+    def for_intents(cls, qa_pairs):
+        """Dictionary of the CJK runs in every keyword plus common words"""
+        words = set(COMMON_CHINESE_WORDS)
+        run_re = re.compile(f'[{CJK_RANGES}]+')
+        for data in qa_pairs.values():
+            for keyword in data["keywords"]:
+                words.update(run_re.findall(keyword))
+        return cls(words)
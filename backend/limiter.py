@@ -0,0 +1,292 @@
+from collections import OrderedDict
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+
+from redis_client import RespPool
+
+
+class RateLimitBackend:
+    """Interface shared by the rate-limit stores"""
+
+    name = None
+
+    def hit(self, key, cost=1):
+        """Record cost requests for key and return False if over the limit
+
+        A rejected hit is all-or-nothing: none of its cost is allowed.
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        return {'backend': self.name}
+
+
+class MemoryRateLimiter(RateLimitBackend):
+    """Fixed-window rate limiter with a hard cap on tracked clients
+
+    Entries are kept in window-start order: a client that opens a new window
+    moves to the back. Stale windows therefore always sit at the front and are
+    dropped in amortized O(1) per request, and when the table is full the
+    client with the oldest window is evicted to make room.
+    """
+
+    name = 'memory'
+    # A [count, window_start] list and its two numbers; only the key varies
+    ENTRY_BYTES = sys.getsizeof([0, 0.0]) + sys.getsizeof(0) + sys.getsizeof(0.0)
+
+    def __init__(self, max_requests, window, max_entries=10000, clock=time.monotonic):
+        self.max_requests = max_requests
+        self.window = window
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> [count, window_start]
+        self._key_bytes = 0  # kept up to date so stats() never walks the table
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def _expire(self, now):
+        entries = self._entries
+        while entries:
+            key, (_, window_start) = next(iter(entries.items()))
+            if now - window_start < self.window:
+                break
+            del entries[key]
+            self._key_bytes -= sys.getsizeof(key)
+            self.expirations += 1
+
+    def hit(self, key, cost=1):
+        now = self._clock()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_entries:
+                    evicted, _ = self._entries.popitem(last=False)
+                    self._key_bytes -= sys.getsizeof(evicted)
+                    self.evictions += 1
+                entry = self._entries[key] = [0, now]
+                self._key_bytes += sys.getsizeof(key)
+            if entry[0] + cost > self.max_requests:
+                return False
+            entry[0] += cost
+            return True
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._key_bytes = 0
+
+    def memory_usage(self):
+        """Approximate bytes held by the table, its keys and entries
+
+        Constant time and lock-free, as /api/health calls it on every check.
+        """
+        entries = self._entries
+        return sys.getsizeof(entries) + self._key_bytes + len(entries) * self.ENTRY_BYTES
+
+    def stats(self):
+        return {
+            'backend': self.name,
+            'entries': len(self._entries),
+            'maxEntries': self.max_entries,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'memoryBytes': self.memory_usage(),
+        }
+
+
+class SharedMemoryRateLimiter(RateLimitBackend):
+    """Fixed-window rate limiter shared by every worker process on a host
+
+    Counters live in a memory-mapped file laid out as a set-associative hash
+    table: a client hashes to one bucket of a few slots. Each update takes a
+    byte-range lock on just that bucket, so workers see one global count per
+    client without a network round trip and without contending on a single
+    lock. A full bucket reuses its expired or oldest slot, which keeps the
+    file at a fixed size.
+    """
+
+    MAGIC = b'RLv1'
+    HEADER = struct.Struct('<4sII4x')  # magic, buckets, ways
+    SLOT = struct.Struct('<Qdi4x')  # key hash, window start, count
+
+    name = 'shm'
+
+    def __init__(self, path, max_requests, window, max_entries=10000, ways=8, clock=time.time):
+        # Byte-range locks are POSIX only; imported here so the in-memory
+        # limiter keeps working on platforms without fcntl
+        import fcntl
+
+        self._fcntl = fcntl
+        self.path = path
+        self.max_requests = max_requests
+        self.window = window
+        self.ways = ways
+        self.buckets = max(1, -(-max_entries // ways))
+        self.max_entries = self.buckets * ways
+        self._clock = clock
+        self._bucket_size = self.SLOT.size * ways
+        self._size = self.HEADER.size + self.buckets * self._bucket_size
+        # fcntl locks are per process, so threads in a worker share this one
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size != self._size:
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, self._size)
+            self._map = mmap.mmap(self._fd, self._size)
+            header = self.HEADER.unpack_from(self._map, 0)
+            if header != (self.MAGIC, self.buckets, self.ways):
+                # New file or a different layout: start from an empty table
+                self._map[:] = bytes(self._size)
+                self.HEADER.pack_into(self._map, 0, self.MAGIC, self.buckets, self.ways)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _hash(key):
+        digest = hashlib.blake2b(str(key).encode('utf-8'), digest_size=8).digest()
+        # Zero marks an empty slot
+        return int.from_bytes(digest, 'little') or 1
+
+    def hit(self, key, cost=1):
+        key_hash = self._hash(key)
+        offset = self.HEADER.size + (key_hash % self.buckets) * self._bucket_size
+        slot_struct, window = self.SLOT, self.window
+        with self._lock:
+            self._fcntl.lockf(self._fd, self._fcntl.LOCK_EX, self._bucket_size, offset)
+            try:
+                now = self._clock()
+                victim = None
+                victim_start = None
+                for slot in range(offset, offset + self._bucket_size, slot_struct.size):
+                    slot_hash, window_start, count = slot_struct.unpack_from(self._map, slot)
+                    if slot_hash == key_hash:
+                        if now - window_start >= window:
+                            window_start, count = now, 0
+                        if count + cost > self.max_requests:
+                            return False
+                        slot_struct.pack_into(self._map, slot, key_hash, window_start, count + cost)
+                        return True
+                    if slot_hash == 0 or now - window_start >= window:
+                        # Free and stale slots are taken before any live one
+                        window_start = float('-inf')
+                    if victim is None or window_start < victim_start:
+                        victim, victim_start = slot, window_start
+
+                if victim_start != float('-inf'):
+                    self.evictions += 1
+                if cost > self.max_requests:
+                    slot_struct.pack_into(self._map, victim, key_hash, now, 0)
+                    return False
+                slot_struct.pack_into(self._map, victim, key_hash, now, cost)
+                return True
+            finally:
+                self._fcntl.lockf(self._fd, self._fcntl.LOCK_UN, self._bucket_size, offset)
+
+    def __len__(self):
+        """Number of live windows, read without locking"""
+        now = self._clock()
+        live = 0
+        for slot in range(self.HEADER.size, self._size, self.SLOT.size):
+            slot_hash, window_start, _ = self.SLOT.unpack_from(self._map, slot)
+            if slot_hash and now - window_start < self.window:
+                live += 1
+        return live
+
+    def clear(self):
+        with self._lock:
+            self._fcntl.lockf(self._fd, self._fcntl.LOCK_EX)
+            try:
+                self._map[self.HEADER.size:] = bytes(self._size - self.HEADER.size)
+            finally:
+                self._fcntl.lockf(self._fd, self._fcntl.LOCK_UN)
+
+    def stats(self):
+        return {
+            'backend': self.name,
+            'entries': len(self),
+            'maxEntries': self.max_entries,
+            # Evictions made by this worker only; the table itself is shared
+            'evictions': self.evictions,
+            'memoryBytes': self._size,
+        }
+
+
+class RedisRateLimiter(RateLimitBackend):
+    """Fixed-window rate limiter stored in a Redis-protocol server
+
+    Each check is one pipelined MULTI/EXEC round trip on a pooled connection:
+    SET NX EX opens the window and INCRBY counts the request, atomically.
+    Unlike the local stores, a rejected hit still adds its cost to the
+    window, which only makes an abusive client wait for the reset. When
+    the server errors or does not answer within the timeout, the limiter
+    fails open to a local in-memory limiter and stops calling the server for
+    a short cool-down, so a slow store never stalls requests.
+    """
+
+    name = 'redis'
+
+    def __init__(self, url, max_requests, window, timeout=0.05, fallback=None,
+                 retry_after=5, prefix='ratelimit:', clock=time.monotonic):
+        self.max_requests = max_requests
+        self.window = window
+        self.retry_after = retry_after
+        self.prefix = prefix
+        self._clock = clock
+        self._pool = RespPool(url, timeout=timeout)
+        self._fallback = fallback or MemoryRateLimiter(max_requests, window)
+        self._down_until = 0.0
+        self.errors = 0
+        self.fallbacks = 0
+
+    def hit(self, key, cost=1):
+        if self._clock() < self._down_until:
+            self.fallbacks += 1
+            return self._fallback.hit(key, cost)
+
+        redis_key = self.prefix + str(key)
+        try:
+            replies = self._pool.pipeline([
+                ('MULTI',),
+                ('SET', redis_key, 0, 'EX', self.window, 'NX'),
+                ('INCRBY', redis_key, cost),
+                ('EXEC',),
+            ])
+            count = replies[-1][1]
+        except Exception:
+            # Fail open: keep limiting locally until the store recovers
+            self.errors += 1
+            self.fallbacks += 1
+            self._down_until = self._clock() + self.retry_after
+            return self._fallback.hit(key, cost)
+        return count <= self.max_requests
+
+    def clear(self):
+        self._fallback.clear()
+
+    def stats(self):
+        return {
+            'backend': self.name,
+            'available': self._clock() >= self._down_until,
+            'errors': self.errors,
+            'fallbacks': self.fallbacks,
+            'connectionsCreated': self._pool.created,
+            'idleConnections': self._pool.idle_count(),
+            'fallbackStore': self._fallback.stats(),
+        }
@@ -0,0 +1,251 @@
+from collections import deque
+from itertools import islice
+import re
+
+from language import CJK_RANGES
+
+# Words, numbers and dotted or suffixed names such as node.js, c++ and c#.
+# Runs of Chinese characters are separate tokens, segmented further by words().
+_token_re = re.compile(
+    rf"[{CJK_RANGES}]+|[^\W_{CJK_RANGES}]+(?:\.[^\W_{CJK_RANGES}]+)*(?:\+\+|#)?"
+)
+_cjk_token_re = re.compile(f'[{CJK_RANGES}]')
+
+# Function words say nothing about the intent on their own. They only count
+# next to a content word ("previous job") or inside a whole keyword phrase
+# ("who are you", "where do you work").
+STOP_WORDS = frozenset("""
+    a about am an and any are at be can could did do does for from have how i
+    in is it me my of on or please so tell that the this to was what when
+    where which who why will with would you your
+""".split())
+
+
+def tokenize(text):
+    """Split lowercased text into word tokens"""
+    return _token_re.findall(text)
+
+
+def normalize(token):
+    """Fold a plain English plural onto its singular ("projects", "technologies")
+
+    Only ever changes tokens ending in "s".
+    """
+    if len(token) > 3 and token.isalpha():
+        if token.endswith('ies'):
+            return token[:-3] + 'y'
+        if token.endswith('s') and not token.endswith('ss'):
+            return token[:-1]
+    return token
+
+
+def words(text, segmenter=None):
+    """Normalized word tokens of lowercased text
+
+    Chinese has no spaces between words: its runs are split by segmenter,
+    or into single characters without one.
+    """
+    tokens = []
+    for token in _token_re.findall(text):
+        if token[0] >= '\u3400' and _cjk_token_re.match(token):
+            tokens += segmenter.segment(token) if segmenter is not None else token
+        elif token[-1] == 's':
+            tokens.append(normalize(token))
+        else:
+            tokens.append(token)
+    return tokens
+
+
+def _best(scores, categories, boost):
+    """Index of the top score; ties go to a category in boost, then the first"""
+    return min(scores, key=lambda index: (-scores[index], categories[index] not in boost, index))
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over every qa_pairs keyword
+
+    The automaton is built once at startup. A single pass over the message
+    reports every keyword hit together with the categories that list it, so
+    the cost of a lookup no longer grows with the number of intents.
+    """
+
+    def __init__(self, qa_pairs):
+        # Category order decides ties, exactly like max() over qa_pairs did
+        self.categories = [category for category in qa_pairs if category != "default"]
+
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        self._pattern_categories = []
+        self._always = []
+
+        patterns = {}
+        for index, category in enumerate(self.categories):
+            for keyword in qa_pairs[category]["keywords"]:
+                if not keyword:
+                    # An empty keyword is "in" every message
+                    self._always.append(index)
+                    continue
+                if keyword not in patterns:
+                    patterns[keyword] = len(self._pattern_categories)
+                    self._pattern_categories.append([])
+                self._pattern_categories[patterns[keyword]].append(index)
+
+        for keyword, pattern_id in patterns.items():
+            self._add(keyword, pattern_id)
+        self._link()
+
+        self._pattern_categories = [tuple(c) for c in self._pattern_categories]
+        self.pattern_count = len(patterns)
+
+    def _add(self, keyword, pattern_id):
+        node = 0
+        for char in keyword:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            node = next_node
+        self._output[node] += (pattern_id,)
+
+    def _link(self):
+        """Compute failure links breadth-first and merge suffix outputs"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] += self._output[self._fail[child]]
+
+    def hits(self, text):
+        """Return the ids of all keywords occurring in text, in one pass"""
+        goto, fail, output = self._goto, self._fail, self._output
+        found = set()
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                found.update(output[node])
+        return found
+
+    def scores(self, text):
+        """Score each category by the number of its keywords found in text"""
+        scores = {}
+        for index in self._always:
+            scores[index] = scores.get(index, 0) + 1
+        for pattern_id in self.hits(text):
+            for index in self._pattern_categories[pattern_id]:
+                scores[index] = scores.get(index, 0) + 1
+        return scores
+
+    def best_category(self, text, boost=()):
+        """Return the highest scoring category, or None when nothing matched"""
+        scores = self.scores(text)
+        if not scores:
+            return None
+        return self.categories[_best(scores, self.categories, boost)]
+
+
+class TokenIndexMatcher:
+    """Inverted index from keyword phrases to categories
+
+    Keywords and messages are split into the same word tokens: runs of
+    letters and digits, keeping dotted and suffixed names such as node.js,
+    c++ and c# whole, with plurals folded onto the singular. A keyword
+    matches when all of its tokens appear consecutively in the message, so
+    "hi" matches "hi there" but not "this", "js" matches "next js" but not
+    "json", and "full-stack developer" matches "full stack developers".
+    A category scores one point per matching keyword and ties go to the
+    first category, as in KeywordMatcher, unless one of them is boosted.
+
+    A lookup walks the message tokens once, extending a phrase only while
+    it is still the start of some keyword, so it costs O(tokens) dictionary
+    lookups regardless of how many keywords there are.
+
+    Chinese keywords and messages are split into words by segmenter (see
+    language.ChineseSegmenter), or into single characters without one.
+    """
+
+    def __init__(self, qa_pairs, segmenter=None):
+        self.categories = [category for category in qa_pairs if category != "default"]
+        self.segmenter = segmenter
+
+        self._index = {}  # phrase -> index of each category keyword it came from
+        self._prefixes = set()  # proper leading phrases of multi-word keywords
+        self._always = []
+
+        for index, category in enumerate(self.categories):
+            for keyword in qa_pairs[category]["keywords"]:
+                if not keyword:
+                    # An empty keyword is "in" every message
+                    self._always.append(index)
+                    continue
+                tokens = words(keyword.lower(), segmenter)
+                if not tokens:
+                    # Punctuation only; it has no word boundaries to match on
+                    continue
+                # Listed once per keyword, so "skill" and "skills" both count
+                self._index.setdefault(' '.join(tokens), []).append(index)
+                for end in range(1, len(tokens)):
+                    self._prefixes.add(' '.join(tokens[:end]))
+
+        self._index = {phrase: tuple(listed) for phrase, listed in self._index.items()}
+        self.phrase_count = len(self._index)
+
+    def hits(self, text):
+        """Return every keyword phrase found in lowercased text"""
+        index, prefixes = self._index, self._prefixes
+        tokens = words(text, self.segmenter)
+        found = set()
+        for start, phrase in enumerate(tokens):
+            if phrase in index:
+                found.add(phrase)
+            if phrase in prefixes:
+                for token in islice(tokens, start + 1, None):
+                    phrase += ' ' + token
+                    if phrase in index:
+                        found.add(phrase)
+                    if phrase not in prefixes:
+                        break
+        return found
+
+    def scores(self, text):
+        """Score each category by the number of its keywords found in text"""
+        scores = {}
+        for index in self._always:
+            scores[index] = scores.get(index, 0) + 1
+        for phrase in self.hits(text):
+            for index in self._index[phrase]:
+                scores[index] = scores.get(index, 0) + 1
+        return scores
+
+    def best_category(self, text, boost=()):
+        """Return the highest scoring category, or None when nothing matched"""
+        scores = self.scores(text)
+        if not scores:
+            return None
+        return self.categories[_best(scores, self.categories, boost)]
+
+
+class FallbackMatcher:
+    """Ask a second matcher only when the first one found nothing"""
+
+    def __init__(self, matcher, fallback):
+        self.matcher = matcher
+        self.fallback = fallback
+        self.categories = matcher.categories
+
+    def best_category(self, text, boost=()):
+        best = self.matcher.best_category(text, boost)
+        if best is not None:
+            return best
+        return self.fallback.best_category(text, boost)
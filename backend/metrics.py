@@ -0,0 +1,309 @@
+"""Low-overhead metrics rendered in the Prometheus text format
+
+Each process records into its own values store. When a directory is given
+the store is a memory-mapped file named after the process id, and any
+worker can render totals for every worker by reading all the files, so a
+scrape of /api/metrics is correct no matter which gunicorn worker serves
+it. Without a directory the values simply live in this process.
+"""
+from bisect import bisect_left
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+
+_used = struct.Struct('<I4x')
+_key_length = struct.Struct('<I')
+_value = struct.Struct('<d')
+
+
+class MmapValues:
+    """Append-only key -> float store in a file with a single writer
+
+    Entries are a length-prefixed key padded to 8 bytes followed by a
+    double. The used size in the header is bumped only after an entry is
+    fully written, so readers in other processes never see a torn entry.
+    """
+
+    def __init__(self, path, initial_size=64 * 1024):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.ftruncate(self._fd, initial_size)
+        self._size = initial_size
+        self._map = mmap.mmap(self._fd, initial_size)
+        self._used = _used.size
+        _used.pack_into(self._map, 0, self._used)
+        self._positions = {}
+
+    def _append(self, key):
+        encoded = key.encode('utf-8')
+        padded = _key_length.size + len(encoded)
+        padded += -padded % 8
+        needed = self._used + padded + _value.size
+        if needed > self._size:
+            while needed > self._size:
+                self._size *= 2
+            os.ftruncate(self._fd, self._size)
+            self._map.close()
+            self._map = mmap.mmap(self._fd, self._size)
+        _key_length.pack_into(self._map, self._used, len(encoded))
+        self._map[self._used + _key_length.size:self._used + _key_length.size + len(encoded)] = encoded
+        position = self._used + padded
+        _value.pack_into(self._map, position, 0.0)
+        self._used = needed
+        _used.pack_into(self._map, 0, self._used)
+        self._positions[key] = position
+        return position
+
+    def add(self, key, amount):
+        position = self._positions.get(key)
+        if position is None:
+            position = self._append(key)
+        _value.pack_into(self._map, position, _value.unpack_from(self._map, position)[0] + amount)
+
+    def set(self, key, value):
+        position = self._positions.get(key)
+        if position is None:
+            position = self._append(key)
+        _value.pack_into(self._map, position, value)
+
+    @staticmethod
+    def read(path):
+        """Return every key and value in a store written by any process"""
+        with open(path, 'rb') as store:
+            data = store.read()
+        if len(data) < _used.size:
+            return {}
+        used = min(_used.unpack_from(data, 0)[0], len(data))
+        values = {}
+        position = _used.size
+        while position < used:
+            length = _key_length.unpack_from(data, position)[0]
+            key = data[position + _key_length.size:position + _key_length.size + length].decode('utf-8')
+            position += _key_length.size + length
+            position += -position % 8
+            values[key] = _value.unpack_from(data, position)[0]
+            position += _value.size
+        return values
+
+
+class DictValues:
+    """Process-local values store used when no metrics directory is set"""
+
+    def __init__(self):
+        self.values = {}
+
+    def add(self, key, amount):
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def set(self, key, value):
+        self.values[key] = value
+
+
+def _sample_key(name, labels):
+    return json.dumps([name, labels], separators=(',', ':'))
+
+
+class Counter:
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._keys = {}
+
+    def inc(self, *labelvalues, amount=1.0):
+        key = self._keys.get(labelvalues)
+        if key is None:
+            key = self._keys[labelvalues] = _sample_key(self.name + '_total', list(labelvalues))
+        self.registry.add(key, amount)
+
+    def samples(self, values):
+        prefix = self.name + '_total'
+        for (name, labels), value in values.items():
+            if name == prefix:
+                yield name, dict(zip(self.labelnames, labels)), value
+
+
+class Gauge:
+    """A gauge; "livesum" adds live workers' values, "max" takes the largest"""
+
+    def __init__(self, registry, name, documentation, mode='livesum', labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.mode = mode
+        self.labelnames = labelnames
+        self._keys = {}
+
+    def set(self, value, *labelvalues):
+        key = self._keys.get(labelvalues)
+        if key is None:
+            key = self._keys[labelvalues] = _sample_key(self.name, list(labelvalues))
+        self.registry.set(key, value)
+
+    def samples(self, values):
+        for (name, labels), value in values.items():
+            if name == self.name:
+                yield name, dict(zip(self.labelnames, labels)), value
+
+
+class Histogram:
+    def __init__(self, registry, name, documentation, buckets, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labelnames = labelnames
+        # Bucket keys are built once per label set, not per observation
+        self._keys = {}
+
+    def _keys_for(self, labelvalues):
+        keys = self._keys.get(labelvalues)
+        if keys is None:
+            labels = list(labelvalues)
+            keys = (
+                [_sample_key(self.name + '_bucket', labels + [repr(bound)]) for bound in self.buckets]
+                + [_sample_key(self.name + '_bucket', labels + ['+Inf'])],
+                _sample_key(self.name + '_sum', labels),
+                _sample_key(self.name + '_count', labels),
+            )
+            self._keys[labelvalues] = keys
+        return keys
+
+    def observe(self, value, *labelvalues):
+        bucket_keys, sum_key, count_key = self._keys_for(labelvalues)
+        with self.registry.lock:
+            values = self.registry.values()
+            values.add(bucket_keys[bisect_left(self.buckets, value)], 1.0)
+            values.add(sum_key, value)
+            values.add(count_key, 1.0)
+
+    def samples(self, values):
+        series = {}
+        for (name, labels), value in values.items():
+            if name == self.name + '_bucket':
+                base = tuple(labels[:-1])
+                series.setdefault(base, {'buckets': {}, 'sum': 0.0, 'count': 0.0})['buckets'][labels[-1]] = value
+            elif name in (self.name + '_sum', self.name + '_count'):
+                kind = name[len(self.name) + 1:]
+                series.setdefault(tuple(labels), {'buckets': {}, 'sum': 0.0, 'count': 0.0})[kind] = value
+        for labels, data in sorted(series.items()):
+            label_dict = dict(zip(self.labelnames, labels))
+            cumulative = 0.0
+            for bound in [repr(bound) for bound in self.buckets] + ['+Inf']:
+                cumulative += data['buckets'].get(bound, 0.0)
+                yield self.name + '_bucket', dict(label_dict, le=bound), cumulative
+            yield self.name + '_sum', label_dict, data['sum']
+            yield self.name + '_count', label_dict, data['count']
+
+
+class MetricsRegistry:
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.metrics = []
+        self.lock = threading.Lock()
+        self._values = None
+        self._pid = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def values(self):
+        """This process's values store, reopened after a fork"""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            if self.directory:
+                self._values = MmapValues(os.path.join(self.directory, f'metrics_{self._pid}.db'))
+            else:
+                self._values = DictValues()
+        return self._values
+
+    def add(self, key, amount):
+        with self.lock:
+            self.values().add(key, amount)
+
+    def set(self, key, value):
+        with self.lock:
+            self.values().set(key, value)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name, documentation, mode='livesum', labelnames=()):
+        return self._register(Gauge(self, name, documentation, mode, labelnames))
+
+    def histogram(self, name, documentation, buckets, labelnames=()):
+        return self._register(Histogram(self, name, documentation, buckets, labelnames))
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def _collect(self):
+        """Per-process values keyed by (sample name, label values)"""
+        if not self.directory:
+            with self.lock:
+                values = dict(self.values().values)
+            return {os.getpid(): values}
+        collected = {}
+        for path in glob.glob(os.path.join(self.directory, 'metrics_*.db')):
+            pid = int(os.path.basename(path)[len('metrics_'):-len('.db')])
+            try:
+                collected[pid] = MmapValues.read(path)
+            except OSError:
+                continue
+        return collected
+
+    @staticmethod
+    def _alive(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def render(self):
+        """Render every metric, aggregated across worker processes"""
+        per_process = {}
+        for pid, values in self._collect().items():
+            samples = per_process[pid] = {}
+            for key, value in values.items():
+                name, labels = json.loads(key)
+                samples[(name, tuple(labels))] = value
+        lines = []
+        for metric in self.metrics:
+            kind = type(metric).__name__.lower()
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {kind}')
+
+            totals = {}
+            for pid, values in per_process.items():
+                if isinstance(metric, Gauge):
+                    if metric.mode == 'livesum' and pid != os.getpid() and not self._alive(pid):
+                        continue
+                for key, value in values.items():
+                    if isinstance(metric, Gauge) and metric.mode == 'max':
+                        totals[key] = max(totals.get(key, value), value)
+                    else:
+                        totals[key] = totals.get(key, 0.0) + value
+
+            for name, labels, value in metric.samples(totals):
+                label_text = ','.join(f'{label}="{_escape(str(label_value))}"'
+                                      for label, label_value in labels.items())
+                lines.append(f'{name}{{{label_text}}} {_format(value)}' if label_text
+                             else f'{name} {_format(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format(value):
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
@@ -0,0 +1,135 @@
+"""Capture of the questions the knowledge base could not answer
+
+Every message answered with the default response is a gap in the intents.
+The sanitized text, with email addresses, links, IP addresses and phone
+or other long numbers replaced by placeholders unless scrubbing is turned
+off, goes into a bounded ring buffer: when misses come faster than they
+are written, the oldest are overwritten and counted. A background thread
+per process appends the buffer to a JSON Lines file in batches. Each batch
+is a single append, so several gunicorn workers can share one file
+without interleaving lines.
+
+tools/miss_report.py groups the file's near-duplicate questions by count.
+"""
+from collections import deque
+import atexit
+import json
+import os
+import re
+import threading
+import time
+
+# Most specific first: the address in "mail me at a@b.com" is not a URL
+_pii_patterns = [
+    (re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+'), '<email>'),
+    (re.compile(r'\b(?:https?://|www\.)\S+', re.IGNORECASE), '<url>'),
+    (re.compile(r'\b\d{1,3}(?:\.\d{1,3}){3}\b'), '<ip>'),
+    (re.compile(r'(?<![\w<])\+?\(?\d[\d ().-]{6,}\d(?!\w)'), '<number>'),
+    (re.compile(r'\b\d{5,}\b'), '<number>'),
+]
+
+
+def scrub_pii(text):
+    """Replace email addresses, links, IP addresses and long numbers with placeholders"""
+    for pattern, placeholder in _pii_patterns:
+        text = pattern.sub(placeholder, text)
+    return text
+
+
+class MissLog:
+    """Ring buffer of unanswered messages, appended to a JSONL file in batches"""
+
+    def __init__(self, path, capacity=1000, flush_interval=5.0, batch_size=100, scrub=True, clock=time.time):
+        self.path = path
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.scrub = scrub
+        self._clock = clock
+        self._buffer = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flush_pid = None
+        self.recorded = 0
+        self.overwritten = 0
+        self.flushes = 0
+        self.lines_written = 0
+        self.errors = 0
+        atexit.register(self.flush)
+
+    def record(self, text, language):
+        """Queue one sanitized message that got the default answer"""
+        if self.scrub:
+            text = scrub_pii(text)
+        self.ensure_flushing()
+        with self._lock:
+            if len(self._buffer) == self.capacity:
+                self.overwritten += 1
+            self._buffer.append((self._clock(), text, language))
+            self.recorded += 1
+            buffered = len(self._buffer)
+        if buffered >= self.batch_size:
+            self._wake.set()
+
+    def ensure_flushing(self):
+        """Start this process's writer thread if it is not running yet"""
+        if self._flush_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flush_pid == os.getpid():
+                return
+            self._flush_pid = os.getpid()
+            # Misses buffered before a fork were the parent's to write
+            self._buffer.clear()
+        threading.Thread(target=self._flush_loop, name='miss-writer', daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Append everything buffered to the file in one write"""
+        with self._lock:
+            batch = list(self._buffer)
+            self._buffer.clear()
+        if not batch:
+            return 0
+        lines = ''.join(
+            json.dumps({'time': round(at, 3), 'language': language, 'message': text}, ensure_ascii=False) + '\n'
+            for at, text, language in batch
+        ).encode('utf-8')
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, mode=0o700, exist_ok=True)
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                written = 0
+                while written < len(lines):
+                    written += os.write(fd, lines[written:])
+            finally:
+                os.close(fd)
+        except OSError:
+            # Best effort: a full disk costs these misses, not an answer
+            self.errors += 1
+            return 0
+        self.flushes += 1
+        self.lines_written += len(batch)
+        return len(batch)
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'capacity': self.capacity,
+            'buffered': len(self._buffer),
+            'recorded': self.recorded,
+            'overwritten': self.overwritten,
+            'flushes': self.flushes,
+            'linesWritten': self.lines_written,
+            'errors': self.errors,
+        }
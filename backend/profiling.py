@@ -0,0 +1,206 @@
+"""Opt-in profiling of sampled chat requests
+
+Nothing here is imported unless profiling is configured, and the chat view
+is only wrapped then, so a normal deployment pays nothing for it.
+
+A request is profiled when a random draw falls under rate, or when it
+carries a token signed with the shared secret (see sign_token), so a
+single request can be traced on demand without profiling everyone else.
+Two modes are available:
+
+- "stacks": while a sampled request is running, an interval timer
+  (SIGALRM) interrupts the process and the stack of every thread serving a
+  sampled request is recorded. The timer runs on wall time, so waits on
+  locks, SQLite or Redis show up as well as computation. Identical stacks
+  are only counted, so the cost is one dictionary update per tick. The
+  totals are written in the collapsed-stack format read by flamegraph.pl
+  and speedscope.
+- "pstats": cProfile traces every call of a sampled request, one request
+  at a time, and the accumulated statistics are written for pstats or
+  snakeviz. Exact, but it slows the sampled requests down several times.
+
+Files are written to directory every flush_every sampled requests and at
+exit, one per process: chat-<pid>.folded or chat-<pid>.pstats.
+"""
+from functools import wraps
+import atexit
+import cProfile
+import hashlib
+import hmac
+import os
+import random
+import signal
+import sys
+import tempfile
+import threading
+import time
+
+MODES = ('stacks', 'pstats')
+
+
+def sign_token(secret, expires):
+    """A token for the profiling header, valid until the unix time expires"""
+    expires = str(int(expires))
+    signature = hmac.new(secret.encode('utf-8'), expires.encode('ascii'), hashlib.sha256).hexdigest()
+    return f'{expires}.{signature}'
+
+
+def verify_token(secret, token, now=None):
+    """True when token was signed with secret and has not expired"""
+    if not secret or not token:
+        return False
+    expires, _, signature = token.partition('.')
+    # Headers arrive as Latin-1, and isdigit() alone accepts "²", which int() rejects
+    if not (expires.isascii() and expires.isdecimal()) or int(expires) < (time.time() if now is None else now):
+        return False
+    # compare_digest only takes ASCII strings; bytes for whatever the client sent
+    return hmac.compare_digest(sign_token(secret, int(expires)).encode('ascii'), token.encode('utf-8', 'replace'))
+
+
+class RequestProfiler:
+    """Profile a fraction of the calls to a view and write the results to disk"""
+
+    def __init__(self, directory, rate=0.0, secret='', mode='stacks', interval=0.001, flush_every=50):
+        if mode not in MODES:
+            raise ValueError(f'profiling mode must be one of {MODES}, not {mode!r}')
+        if mode == 'stacks' and not hasattr(signal, 'setitimer'):
+            # No interval timers (Windows): trace instead
+            mode = 'pstats'
+        self.directory = directory
+        self.rate = rate
+        self.secret = secret
+        self.mode = mode
+        self.interval = interval
+        self.flush_every = flush_every
+        self.requests = 0
+        self.samples = 0
+        self.skipped = 0
+        self.files = 0
+        self._lock = threading.Lock()
+        self._active = {}  # thread ident -> sampled requests it is running
+        self._stacks = {}  # collapsed stack -> samples
+        self._labels = {}  # code object -> frame label
+        self._remaining = interval  # timer left over from the last sampled request
+        if mode == 'stacks':
+            # Must run in the main thread, which is where the app is imported
+            signal.signal(signal.SIGALRM, self._sample)
+        else:
+            self._profile = cProfile.Profile()
+            self._tracing = threading.Lock()
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        atexit.register(self.flush)
+
+    def wrap(self, function, token=lambda: None):
+        """Profile sampled calls of function; token() returns the request's signed token"""
+        @wraps(function)
+        def profiled(*args, **kwargs):
+            if not (verify_token(self.secret, token()) or (self.rate and random.random() < self.rate)):
+                return function(*args, **kwargs)
+            if self.mode == 'stacks':
+                return self._run_sampled(function, args, kwargs)
+            return self._run_traced(function, args, kwargs)
+        return profiled
+
+    def _run_sampled(self, function, args, kwargs):
+        ident = threading.get_ident()
+        with self._lock:
+            self._active[ident] = self._active.get(ident, 0) + 1
+            if len(self._active) == 1 and self._active[ident] == 1:
+                # Resume where the last request stopped, so requests shorter
+                # than the interval still add up to samples
+                signal.setitimer(signal.ITIMER_REAL, self._remaining, self.interval)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._active[ident] -= 1
+                if not self._active[ident]:
+                    del self._active[ident]
+                if not self._active:
+                    remaining = signal.setitimer(signal.ITIMER_REAL, 0)[0]
+                    self._remaining = min(remaining, self.interval) or self.interval
+            self._finished()
+
+    def _run_traced(self, function, args, kwargs):
+        # cProfile follows one thread at a time; concurrent picks run untraced
+        if not self._tracing.acquire(blocking=False):
+            self.skipped += 1
+            return function(*args, **kwargs)
+        try:
+            self._profile.enable()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self._profile.disable()
+        finally:
+            self._tracing.release()
+            self._finished()
+
+    def _finished(self):
+        self.requests += 1
+        if self.requests % self.flush_every == 0:
+            self.flush()
+
+    def _sample(self, signum, frame):
+        """SIGALRM handler; takes no locks, the interrupted thread may hold one"""
+        frames = sys._current_frames()
+        stacks = self._stacks
+        for ident in tuple(self._active):
+            current = frames.get(ident)
+            if current is not None and current.f_code is self._sample.__code__:
+                current = current.f_back
+            if current is None:
+                continue
+            stack = self._collapse(current)
+            stacks[stack] = stacks.get(stack, 0) + 1
+            self.samples += 1
+
+    def _collapse(self, frame):
+        labels = self._labels
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            label = labels.get(code)
+            if label is None:
+                name = getattr(code, 'co_qualname', code.co_name)
+                label = labels[code] = f'{os.path.basename(code.co_filename)}:{name}'
+            names.append(label)
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def flush(self):
+        """Write everything gathered so far, replacing this process's file"""
+        path = os.path.join(self.directory, f'chat-{os.getpid()}.{"folded" if self.mode == "stacks" else "pstats"}')
+        try:
+            fd, temporary = tempfile.mkstemp(dir=self.directory, prefix='.profile-')
+            os.close(fd)
+            if self.mode == 'stacks':
+                stacks = dict(self._stacks)
+                if not stacks:
+                    os.unlink(temporary)
+                    return None
+                with open(temporary, 'w') as output:
+                    output.writelines(f'{stack} {count}\n' for stack, count in sorted(stacks.items()))
+            else:
+                with self._tracing:
+                    if not self.requests:
+                        os.unlink(temporary)
+                        return None
+                    self._profile.dump_stats(temporary)
+            os.replace(temporary, path)
+        except OSError:
+            return None
+        self.files += 1
+        return path
+
+    def stats(self):
+        return {
+            'mode': self.mode,
+            'rate': self.rate,
+            'signedRequests': bool(self.secret),
+            'directory': self.directory,
+            'requests': self.requests,
+            'samples': self.samples,
+            'skipped': self.skipped,
+            'filesWritten': self.files,
+        }
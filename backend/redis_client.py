@@ -0,0 +1,126 @@
+from urllib.parse import unquote, urlparse
+import os
+import queue
+import socket
+import threading
+
+
+class RespError(Exception):
+    """Error reply or protocol failure from a Redis-protocol server"""
+
+
+def encode_command(*args):
+    """Encode one command as a RESP array of bulk strings"""
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode('utf-8')
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+
+class RespConnection:
+    """A single blocking connection speaking the Redis protocol"""
+
+    def __init__(self, host, port, timeout, password=None, db=0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+        setup = []
+        if password:
+            setup.append(('AUTH', password))
+        if db:
+            setup.append(('SELECT', db))
+        if setup:
+            self.pipeline(setup)
+
+    def pipeline(self, commands):
+        """Send every command in one write and read all replies back"""
+        self.sock.sendall(b''.join(encode_command(*command) for command in commands))
+        replies = [self.read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+    def read_reply(self):
+        line = self.reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise RespError('connection closed by server')
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode('utf-8')
+        if kind == b'-':
+            return RespError(payload.decode('utf-8'))
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self.read_reply() for _ in range(length)]
+        raise RespError(f'unexpected reply type {kind!r}')
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RespPool:
+    """Small pool of reusable connections to one server
+
+    Connections are never shared between processes: after a fork the child
+    drops whatever it inherited and dials its own.
+    """
+
+    def __init__(self, url, timeout=0.05, max_idle=8):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle = queue.LifoQueue()
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self.created = 0
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._idle = queue.LifoQueue()
+                    self._pid = os.getpid()
+
+    def pipeline(self, commands):
+        """Run commands on a pooled connection in a single round trip"""
+        self._check_fork()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = RespConnection(self.host, self.port, self.timeout, self.password, self.db)
+            self.created += 1
+        try:
+            replies = conn.pipeline(commands)
+        except Exception:
+            # The connection may hold half-read replies; never reuse it
+            conn.close()
+            raise
+        if self._idle.qsize() < self.max_idle:
+            self._idle.put(conn)
+        else:
+            conn.close()
+        return replies
+
+    def idle_count(self):
+        return self._idle.qsize()
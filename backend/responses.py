@@ -0,0 +1,158 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+import gzip
+import hashlib
+import json
+import re
+
+try:
+    import brotli
+except ImportError:
+    # Optional: gzip alone is understood by every browser
+    brotli = None
+
+# Content codings we can produce, preferred first when sizes tie
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+# Smaller bodies built per request are not worth compressing
+MIN_DYNAMIC_SIZE = 1024
+
+# Allow only specific safe tags
+ALLOWED_TAGS = ['a', 'strong', 'em', 'p', 'br', 'ul', 'ol', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+ALLOWED_ATTRS = {'a': ['href', 'class']}
+
+# Compiled once instead of on every sanitize_response call
+_disallowed_tag_re = re.compile(r'<(?!\/?(?:' + '|'.join(ALLOWED_TAGS) + ')\b)[^>]+>', re.IGNORECASE)
+_attr_res = [
+    (re.compile(rf'<{tag}\s+((?!({allowed})=)[^>]*?)({allowed})=', re.IGNORECASE), rf'<{tag} \3=')
+    for tag, allowed in ((tag, '|'.join(ALLOWED_ATTRS[tag])) for tag in ALLOWED_TAGS if tag in ALLOWED_ATTRS)
+]
+
+
+def sanitize_response(text):
+    """Sanitize response but allow safe HTML tags"""
+    # Remove dangerous tags but keep safe ones
+    text = _disallowed_tag_re.sub('', text)
+
+    # Remove dangerous attributes
+    for pattern, replacement in _attr_res:
+        text = pattern.sub(replacement, text)
+
+    return text
+
+
+# Paragraphs and blocks in the markdown answers are separated by blank lines
+_block_split_re = re.compile(r'\n[ \t]*\n')
+
+
+@dataclass(frozen=True)
+class PreparedResponse:
+    """A chat answer rendered once at startup"""
+    category: str
+    html: str
+    has_links: bool
+    body: bytes
+    # Strong validator of body: the same bytes always get the same tag, so
+    # an answer left untouched by a knowledge base edit stays cached
+    etag: str
+    # Server-sent events for /api/chat/stream: metadata first, then one
+    # event per block, then the end marker
+    events: tuple
+    # Precompressed body and its tag per content coding, smaller ones only
+    encoded: dict
+
+    def variant(self, accept_encoding):
+        """(content coding or None, body, etag) of the smallest acceptable form"""
+        accepted = accepted_encodings(accept_encoding)
+        best = None
+        for encoding in ENCODINGS:
+            if encoding in accepted and encoding in self.encoded:
+                if best is None or len(self.encoded[encoding][0]) < len(self.encoded[best][0]):
+                    best = encoding
+        if best is None:
+            return None, self.body, self.etag
+        return (best,) + self.encoded[best]
+
+    def sizes(self):
+        """Body size in bytes per content coding, "identity" included"""
+        return dict(identity=len(self.body), **{encoding: len(body) for encoding, (body, _) in self.encoded.items()})
+
+
+def sse_event(event, data, dumps=json.dumps):
+    """Encode one server-sent event with a JSON data line"""
+    return f'event: {event}\ndata: {dumps(data, separators=(",", ":"))}\n\n'.encode('utf-8')
+
+
+def prepare_response(category, text, dumps=json.dumps):
+    """Sanitize a response and encode the final /api/chat JSON body"""
+    sanitized = sanitize_response(text)
+    has_links = '<a href=' in sanitized
+    payload = {'response': sanitized, 'hasLinks': has_links}
+    body = (dumps(payload, separators=(',', ':')) + '\n').encode('utf-8')
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+    blocks = [block for block in _block_split_re.split(sanitized) if block.strip()]
+    events = (
+        sse_event('meta', {'category': category, 'hasLinks': has_links, 'blocks': len(blocks)}, dumps),
+        *(sse_event('chunk', {'index': index, 'text': block}, dumps) for index, block in enumerate(blocks)),
+        sse_event('done', {}, dumps),
+    )
+    encoded = {}
+    for encoding in ENCODINGS:
+        compressed = compress(body, encoding)
+        if len(compressed) < len(body):
+            # Each coding is different bytes, so it needs its own strong tag
+            encoded[encoding] = (compressed, f'{etag[:-1]}-{encoding}"')
+    return PreparedResponse(category, sanitized, has_links, body, etag, events, encoded)
+
+
+def compress(body, encoding, dynamic=False):
+    """Compress body; slowest and smallest unless it is done per request"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=5 if dynamic else 11)
+    # mtime=0 keeps the output, and so its tag, the same on every build
+    return gzip.compress(body, 6 if dynamic else 9, mtime=0)
+
+
+@lru_cache(maxsize=256)
+def accepted_encodings(accept_encoding):
+    """The codings in ENCODINGS an Accept-Encoding header value allows"""
+    if not accept_encoding:
+        return frozenset()
+    weights = {}
+    for item in accept_encoding.lower().split(','):
+        name, _, parameters = item.partition(';')
+        weight = 1.0
+        parameter, _, value = parameters.strip().partition('=')
+        if parameter.strip() == 'q':
+            try:
+                weight = float(value)
+            except ValueError:
+                weight = 0.0
+        weights[name.strip()] = weight
+    wildcard = weights.get('*', 0.0)
+    return frozenset(encoding for encoding in ENCODINGS if weights.get(encoding, wildcard) > 0)
+
+
+def etag_matches(if_none_match, etag):
+    """True when an If-None-Match header value lists etag or is "*"
+
+    If-None-Match compares weakly, so a W/ prefix is ignored.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == '*' or candidate == etag:
+            return True
+    return False
+
+
+def compile_responses(qa_pairs, dumps=json.dumps):
+    """Turn every qa_pairs category into an immutable prepared response"""
+    return MappingProxyType({
+        category: prepare_response(category, data["response"], dumps)
+        for category, data in qa_pairs.items()
+    })
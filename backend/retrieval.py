@@ -0,0 +1,218 @@
+"""Ranked retrieval over the qa_pairs intents: BM25 and hashed n-gram vectors
+
+For BM25 every category is treated as a small document made of its keywords. At
+startup the documents are turned into a sparse term -> category weight
+matrix stored column by column (one postings run per term), so answering a
+query is a single gather of the postings of its terms followed by one
+weighted bincount: a sparse dot product whose cost depends on how common
+the query terms are, not on how many intents there are.
+
+VectorMatcher instead embeds text as hashed character n-grams, which
+places paraphrases and inflections ("studying", "certified") near the
+keywords and example questions they share fragments with, without any
+downloaded model.
+
+Requires numpy (pip install numpy).
+"""
+import zlib
+
+import numpy as np
+
+from matcher import STOP_WORDS, words
+
+
+# Whole keywords up to this many words are also matched as one phrase
+MAX_PHRASE = 4
+
+# Boosted categories that matched have their score raised by this factor,
+# so they win near ties without overriding a clearly better match
+BOOST = 1.1
+
+
+def _boosted(scores, positions, boost):
+    indexes = [positions[category] for category in boost if category in positions]
+    if indexes:
+        scores = scores.copy()
+        scores[indexes] *= BOOST
+    return scores
+
+
+def keyword_terms(keyword, segmenter=None):
+    """Terms a lowercased keyword contributes to its category"""
+    tokens = words(keyword, segmenter)
+    found = [token for token in tokens if token not in STOP_WORDS]
+    found += [f'{first} {second}' for first, second in zip(tokens, tokens[1:])
+              if first not in STOP_WORDS or second not in STOP_WORDS]
+    if len(tokens) <= MAX_PHRASE and (len(tokens) > 2 or not found):
+        found.append(' '.join(tokens))
+    return found
+
+
+def query_terms(text, segmenter=None):
+    """Every word and phrase of up to MAX_PHRASE words in a lowercased message
+
+    Only those that some keyword contributed ever score.
+    """
+    tokens = words(text, segmenter)
+    return [' '.join(tokens[start:end])
+            for start in range(len(tokens))
+            for end in range(start + 1, min(start + MAX_PHRASE, len(tokens)) + 1)]
+
+
+class Bm25Matcher:
+    """Rank categories against a message with Okapi BM25
+
+    A keyword shared by many categories ("work") carries little weight, a
+    rare one ("teleperformance") a lot, and categories with long keyword
+    lists are partly length-normalized so they do not win on volume alone.
+    """
+
+    def __init__(self, qa_pairs, k1=1.2, b=0.5, segmenter=None):
+        # Category order still breaks exact ties, as in KeywordMatcher
+        self.categories = [category for category in qa_pairs if category != "default"]
+        self._positions = {category: index for index, category in enumerate(self.categories)}
+        self.k1 = k1
+        self.b = b
+        self.segmenter = segmenter
+
+        vocabulary = {}
+        term_ids, doc_ids, frequencies = [], [], []
+        lengths = np.zeros(len(self.categories), dtype=np.float64)
+        for index, category in enumerate(self.categories):
+            counts = {}
+            for keyword in qa_pairs[category]["keywords"]:
+                for term in keyword_terms(keyword.lower(), segmenter):
+                    counts[term] = counts.get(term, 0) + 1
+            lengths[index] = sum(counts.values())
+            for term, count in counts.items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                doc_ids.append(index)
+                frequencies.append(count)
+
+        self.vocabulary = vocabulary
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        frequencies = np.asarray(frequencies, dtype=np.float64)
+
+        documents = len(self.categories)
+        document_frequency = np.bincount(term_ids, minlength=len(vocabulary))
+        idf = np.log1p((documents - document_frequency + 0.5) / (document_frequency + 0.5))
+        average_length = lengths.mean() if documents and lengths.any() else 1.0
+        norm = k1 * (1 - b + b * lengths[doc_ids] / average_length)
+        weights = idf[term_ids] * frequencies * (k1 + 1) / (frequencies + norm)
+
+        # Postings sorted by term; term t owns [indptr[t], indptr[t + 1])
+        order = np.argsort(term_ids, kind='stable')
+        self._docs = doc_ids[order]
+        self._weights = weights[order].astype(np.float32)
+        self._indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(document_frequency, out=self._indptr[1:])
+
+        self.term_count = len(vocabulary)
+        self.nonzero = len(self._docs)
+
+    def scores(self, text):
+        """BM25 score of every category for a lowercased message"""
+        ids = {self.vocabulary[term] for term in query_terms(text, self.segmenter) if term in self.vocabulary}
+        if not ids:
+            return np.zeros(len(self.categories), dtype=np.float64)
+        ids = np.fromiter(ids, dtype=np.int64, count=len(ids))
+        starts = self._indptr[ids]
+        counts = self._indptr[ids + 1] - starts
+        # Positions of every posting of the query terms, without a Python loop
+        positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        return np.bincount(self._docs[positions], self._weights[positions], minlength=len(self.categories))
+
+    def best_category(self, text, boost=()):
+        """Return the highest ranked category, or None when nothing matched"""
+        scores = self.scores(text)
+        if not len(scores):
+            return None
+        best = int(_boosted(scores, self._positions, boost).argmax())
+        if scores[best] <= 0:
+            return None
+        return self.categories[best]
+
+
+def char_ngrams(text, segmenter=None, sizes=(3, 4, 5)):
+    """Character n-grams of each word, padded so word starts and ends count
+
+    Stop words are left out unless the text has nothing else.
+    """
+    tokens = words(text, segmenter)
+    content = [token for token in tokens if token not in STOP_WORDS]
+    grams = []
+    for word in content or tokens:
+        padded = f' {word} '
+        for size in sizes:
+            grams += [padded[start:start + size] for start in range(len(padded) - size + 1)]
+    return grams
+
+
+class VectorMatcher:
+    """Nearest intent by cosine similarity of hashed character n-gram vectors
+
+    Each keyword and example question becomes a TF-IDF weighted vector of
+    its character n-grams, hashed into a fixed number of dimensions so
+    memory does not depend on the vocabulary. A category's vector is the
+    normalized sum of its phrases. The matrix is stored dimension-major:
+    a query touches only the rows of its own n-grams, and one
+    vector-matrix product over those rows scores every category.
+
+    Answers only when the best similarity reaches threshold.
+    """
+
+    def __init__(self, qa_pairs, dimensions=4096, threshold=0.3, segmenter=None):
+        self.categories = [category for category in qa_pairs if category != "default"]
+        self._positions = {category: index for index, category in enumerate(self.categories)}
+        self.dimensions = dimensions
+        self.threshold = threshold
+        self.segmenter = segmenter
+
+        phrases = []  # (category index, buckets of one phrase)
+        for index, category in enumerate(self.categories):
+            data = qa_pairs[category]
+            for phrase in data["keywords"] + data.get("examples", []):
+                buckets = self._buckets(phrase.lower())
+                if len(buckets):
+                    phrases.append((index, buckets))
+
+        # Inverse document frequency per bucket, counting categories
+        seen = np.zeros((len(self.categories), dimensions), dtype=bool)
+        for index, buckets in phrases:
+            seen[index, buckets] = True
+        self._idf = (np.log((len(self.categories) + 1) / (seen.sum(axis=0) + 1)) + 1).astype(np.float32)
+        del seen
+
+        matrix = np.zeros((dimensions, len(self.categories)), dtype=np.float32)
+        for index, buckets in phrases:
+            vector = np.bincount(buckets, minlength=dimensions).astype(np.float32)
+            vector = np.log1p(vector) * self._idf
+            matrix[:, index] += vector / np.linalg.norm(vector)
+        norms = np.linalg.norm(matrix, axis=0)
+        norms[norms == 0] = 1
+        self._matrix = matrix / norms
+        self.memory_bytes = self._matrix.nbytes + self._idf.nbytes
+
+    def _buckets(self, text):
+        grams = char_ngrams(text, self.segmenter)
+        return np.fromiter((zlib.crc32(gram.encode('utf-8')) % self.dimensions for gram in grams),
+                           dtype=np.int64, count=len(grams))
+
+    def scores(self, text):
+        """Cosine similarity of a lowercased message to every category"""
+        buckets, counts = np.unique(self._buckets(text), return_counts=True)
+        if not len(buckets):
+            return np.zeros(len(self.categories), dtype=np.float32)
+        weights = np.log1p(counts).astype(np.float32) * self._idf[buckets]
+        return (weights / np.linalg.norm(weights)) @ self._matrix[buckets]
+
+    def best_category(self, text, boost=()):
+        """Return the most similar category, or None below the threshold"""
+        scores = self.scores(text)
+        if not len(scores):
+            return None
+        best = int(_boosted(scores, self._positions, boost).argmax())
+        if scores[best] < self.threshold:
+            return None
+        return self.categories[best]
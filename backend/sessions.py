@@ -0,0 +1,243 @@
+"""Short conversation memory: the last few categories answered per session
+
+Clients send an opaque session ID with each message. Every worker keeps
+the most recently active sessions in a bounded LRU; each entry holds at
+most max_turns category names, which are shared with the knowledge base,
+so memory per session is a small constant. Updates are also queued and
+written to a local SQLite database in WAL mode by a background thread, one
+transaction per batch, so sessions evicted from memory, served by another
+worker or outliving a restart are read back on their next message.
+
+Sessions are a hint, never required: an unknown ID simply starts empty,
+and a database error only costs the conversation its memory.
+"""
+from collections import OrderedDict
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+from matcher import words
+
+# Opaque client-generated IDs such as UUIDs; anything else is ignored
+_session_id_re = re.compile(r'[A-Za-z0-9_-]{8,64}')
+
+# A message with one of these that matches nothing refers to the previous
+# answer: "tell me more", "what else", "and that?"
+FOLLOW_UP_WORDS = frozenset("""
+    more else further elaborate detail continue next also that it this those
+    them there
+""".split())
+
+
+def valid_session_id(session_id):
+    """Return session_id if it looks like a client session ID, else None"""
+    if isinstance(session_id, str) and _session_id_re.fullmatch(session_id):
+        return session_id
+    return None
+
+
+def _entry_bytes(session_id, entry):
+    """Bytes of one in-memory session: its ID, entry tuple, turns and timestamp"""
+    return sys.getsizeof(session_id) + sys.getsizeof(entry) + sys.getsizeof(entry[0]) + sys.getsizeof(entry[1])
+
+
+def is_follow_up(text):
+    """True when a lowercased message leans on the previous answer"""
+    return not FOLLOW_UP_WORDS.isdisjoint(words(text))
+
+
+class SessionStore:
+    """Recent turns per session: an LRU in memory, spilled to SQLite
+
+    get() and record() are O(1) in memory; only a session missing from
+    memory costs one indexed read. Sessions idle for longer than ttl
+    seconds are forgotten. path=None keeps everything in memory only.
+    """
+
+    def __init__(self, path=None, max_sessions=10000, max_turns=5, ttl=1800, flush_interval=1.0,
+                 batch_size=256, clock=time.time):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._clock = clock
+        self._sessions = OrderedDict()  # session ID -> (turns, last active)
+        self._bytes = 0  # held by the entries in _sessions, kept up to date
+        self._pending = {}  # session ID -> (turns, last active) not yet written
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._db = None
+        self._db_pid = None
+        self._flush_pid = None
+        if path and os.path.dirname(path):
+            try:
+                os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+            except OSError:
+                pass  # Reported as a database error on first use
+        self.evictions = 0
+        self.spill_reads = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.errors = 0
+
+    def _connection(self):
+        """This process's connection, reopened after a fork"""
+        if self._db_pid != os.getpid():
+            self._db_pid = os.getpid()
+            self._db = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            # Readers never wait for the writer, and commits skip the fsync
+            # that only guards against power loss
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS sessions '
+                             '(id TEXT PRIMARY KEY, turns TEXT NOT NULL, active REAL NOT NULL) WITHOUT ROWID')
+        return self._db
+
+    def get(self, session_id):
+        """The categories answered in a session, oldest first"""
+        now = self._clock()
+        with self._lock:
+            entry = self._sessions.get(session_id) or self._pending.get(session_id)
+            if entry is not None:
+                if now - entry[1] < self.ttl:
+                    self._remember(session_id, entry)
+                    return entry[0]
+                self._forget(self._sessions.pop(session_id, None), session_id)
+                return ()
+        if not self.path:
+            return ()
+
+        entry = self._read(session_id)
+        if entry is None or now - entry[1] >= self.ttl:
+            return ()
+        with self._lock:
+            # A record() that raced this read is newer; keep it
+            entry = self._sessions.get(session_id) or entry
+            self._remember(session_id, entry)
+        return entry[0]
+
+    def _read(self, session_id):
+        try:
+            with self._db_lock:
+                row = self._connection().execute(
+                    'SELECT turns, active FROM sessions WHERE id = ?', (session_id,)
+                ).fetchone()
+        except sqlite3.Error:
+            self.errors += 1
+            return None
+        if row is None:
+            return None
+        self.spill_reads += 1
+        return tuple(sys.intern(category) for category in json.loads(row[0])), row[1]
+
+    def record(self, session_id, category):
+        """Append an answered category to a session"""
+        now = self._clock()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            turns = entry[0] if entry is not None and now - entry[1] < self.ttl else ()
+            entry = ((turns + (category,))[-self.max_turns:], now)
+            self._remember(session_id, entry)
+            if self.path:
+                self._pending[session_id] = entry
+                pending = len(self._pending)
+        if self.path:
+            self.ensure_flushing()
+            if pending >= self.batch_size:
+                self._wake.set()
+
+    def _remember(self, session_id, entry):
+        """Store an entry as most recently used; call with the lock held"""
+        previous = self._sessions.get(session_id)
+        if previous is not entry:
+            self._forget(previous, session_id)
+            self._bytes += _entry_bytes(session_id, entry)
+        self._sessions[session_id] = entry
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            # Already queued for the database when it was last recorded
+            evicted, previous = self._sessions.popitem(last=False)
+            self._forget(previous, evicted)
+            self.evictions += 1
+
+    def _forget(self, entry, session_id):
+        """Stop counting the bytes of a removed entry; call with the lock held"""
+        if entry is not None:
+            self._bytes -= _entry_bytes(session_id, entry)
+
+    def ensure_flushing(self):
+        """Start this process's writer thread if it is not running yet"""
+        if self._flush_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flush_pid == os.getpid():
+                return
+            self._flush_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name='session-writer', daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Write every queued update in one transaction"""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+        rows = [(session_id, json.dumps(turns), active) for session_id, (turns, active) in batch.items()]
+        try:
+            with self._db_lock:
+                db = self._connection()
+                db.execute('BEGIN')
+                try:
+                    db.executemany('INSERT OR REPLACE INTO sessions (id, turns, active) VALUES (?, ?, ?)', rows)
+                    db.execute('DELETE FROM sessions WHERE active < ?', (self._clock() - self.ttl,))
+                    db.execute('COMMIT')
+                except BaseException:
+                    db.execute('ROLLBACK')
+                    raise
+        except sqlite3.Error:
+            # Best effort: these sessions just forget their last turns
+            self.errors += 1
+            return 0
+        self.flushes += 1
+        self.rows_written += len(rows)
+        return len(rows)
+
+    def memory_bytes(self):
+        """Bytes held by the in-memory sessions, not counting shared category names
+
+        Tallied as sessions come and go, so this never walks the table.
+        """
+        return sys.getsizeof(self._sessions) + self._bytes
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self):
+        sessions = len(self._sessions)
+        memory = self.memory_bytes()
+        return {
+            'sessions': sessions,
+            'maxSessions': self.max_sessions,
+            'maxTurns': self.max_turns,
+            'ttl': self.ttl,
+            'memoryBytes': memory,
+            'bytesPerSession': round(memory / sessions) if sessions else 0,
+            'evictions': self.evictions,
+            'spillReads': self.spill_reads,
+            'pendingWrites': len(self._pending),
+            'flushes': self.flushes,
+            'rowsWritten': self.rows_written,
+            'errors': self.errors,
+        }
@@ -0,0 +1,140 @@
+"""Group the questions the chatbot could not answer, most frequent first
+
+Run from the backend directory:
+
+    python tools/miss_report.py [misses.jsonl ...] [--since 24] [--threshold 0.5] [--top 30] [--json]
+
+Reads the files written by the miss capture (CHAT_MISS_LOG by default).
+Questions are compared as sets of character trigrams of their words, with
+plural "s" and function words such as "what is your" removed, so word
+order, small typos and punctuation do not split a group. A question joins
+the most similar group at or above the Jaccard threshold, or starts its
+own. The biggest groups are the intents to add next.
+"""
+import argparse
+from collections import Counter
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from matcher import STOP_WORDS, words  # noqa: E402
+
+# The same default as app.py
+DEFAULT_PATH = os.environ.get('CHAT_MISS_LOG', os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'portfolio-chat', 'misses.jsonl'
+))
+
+
+def read_misses(paths, since=None):
+    """(message, language) of every miss recorded at or after since"""
+    for path in paths:
+        with open(path, encoding='utf-8') as lines:
+            for line in lines:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash mid-write
+                    continue
+                if since is None or entry.get('time', 0) >= since:
+                    yield entry.get('message', ''), entry.get('language')
+
+
+def trigrams(key):
+    grams = set()
+    for word in key.split():
+        padded = f' {word} '
+        grams.update(padded[start:start + 3] for start in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+class Group:
+    def __init__(self, key):
+        self.key = key
+        self.grams = trigrams(key)
+        self.count = 0
+        self.messages = Counter()
+        self.languages = Counter()
+
+
+def group_misses(misses, threshold=0.5):
+    """Near-duplicate groups of (message, language) pairs, biggest first"""
+    messages = Counter()
+    languages = {}
+    by_key = {}
+    for message, language in misses:
+        tokens = words(message.lower())
+        key = ' '.join([token for token in tokens if token not in STOP_WORDS] or tokens)
+        if not key:
+            continue
+        messages[key, message] += 1
+        languages.setdefault(key, Counter())[language] += 1
+        by_key[key] = by_key.get(key, 0) + 1
+
+    groups = []
+    index = {}  # trigram -> groups containing it
+    assigned = {}
+    # Frequent phrasings first, so they become the groups' representatives
+    for key, _ in sorted(by_key.items(), key=lambda item: (-item[1], item[0])):
+        grams = trigrams(key)
+        shared = Counter()
+        for gram in grams:
+            for group in index.get(gram, ()):
+                shared[group] += 1
+        best, best_score = None, threshold
+        for group, overlap in shared.items():
+            score = overlap / (len(grams) + len(group.grams) - overlap)
+            if score >= best_score:
+                best, best_score = group, score
+        if best is None:
+            best = Group(key)
+            groups.append(best)
+            for gram in best.grams:
+                index.setdefault(gram, []).append(best)
+        assigned[key] = best
+        best.count += by_key[key]
+        best.languages.update(languages[key])
+
+    for (key, message), count in messages.items():
+        assigned[key].messages[message] += count
+    return sorted(groups, key=lambda group: -group.count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='*', default=[DEFAULT_PATH])
+    parser.add_argument('--since', type=float, help='only misses from the last this many hours')
+    parser.add_argument('--threshold', type=float, default=0.5, help='trigram Jaccard similarity to join a group')
+    parser.add_argument('--top', type=int, default=30)
+    parser.add_argument('--examples', type=int, default=3, help='phrasings shown per group')
+    parser.add_argument('--json', action='store_true', help='print the groups as JSON')
+    args = parser.parse_args()
+
+    since = time.time() - args.since * 3600 if args.since is not None else None
+    misses = list(read_misses(args.paths, since))
+    groups = group_misses(misses, args.threshold)[:args.top]
+
+    if args.json:
+        print(json.dumps([{
+            'count': group.count,
+            'languages': dict(group.languages),
+            'messages': [{'message': message, 'count': count} for message, count in group.messages.most_common()],
+        } for group in groups], ensure_ascii=False, indent=2))
+        return
+
+    print(f'{len(misses)} misses, {len(groups)} groups shown')
+    for group in groups:
+        languages = ','.join(language or '?' for language, _ in group.languages.most_common())
+        examples = group.messages.most_common(args.examples)
+        print(f'{group.count:>6}  [{languages}]  {examples[0][0]}')
+        for message, count in examples[1:]:
+            print(f'{"":>6}    {count:>4}x {message}')
+        others = len(group.messages) - len(examples)
+        if others > 0:
+            print(f'{"":>6}    and {others} more phrasings')
+
+
+if __name__ == '__main__':
+    main()
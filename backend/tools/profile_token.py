@@ -0,0 +1,37 @@
+"""Print an X-Chat-Profile header value that profiles requests on demand
+
+Run from the backend directory with the server's secret in the environment:
+
+    CHAT_PROFILE_SECRET=... python tools/profile_token.py [--ttl 300]
+
+then send it with the requests to profile, for example
+
+    curl -H "X-Chat-Profile: $(python tools/profile_token.py)" \\
+         -H 'Content-Type: application/json' -d '{"message": "hi"}' \\
+         http://localhost:5000/api/chat
+
+The token is only accepted until it expires. Results land in each
+worker's CHAT_PROFILE_DIR.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from profiling import sign_token  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ttl', type=int, default=300, help='seconds the token stays valid')
+    args = parser.parse_args()
+    secret = os.environ.get('CHAT_PROFILE_SECRET')
+    if not secret:
+        parser.error('CHAT_PROFILE_SECRET is not set')
+    print(sign_token(secret, time.time() + args.ttl))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+"""Local stand-in for a Redis server, for exercising the rate-limit backend
+
+Run from the backend directory. Serve on a port:
+
+    python tools/resp_standin.py --port 6390 [--delay 0.2]
+
+or check RedisRateLimiter against an in-process stand-in:
+
+    python tools/resp_standin.py --check
+
+Only the commands the rate limiter needs are implemented (PING, AUTH,
+SELECT, MULTI, EXEC, DISCARD, SET with EX/PX/NX, GET, INCR, INCRBY, DEL,
+FLUSHALL). --delay holds every reply back to simulate a slow store.
+"""
+import argparse
+import os
+import socketserver
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+class Store:
+    """Keys with optional expiry, guarded by one lock"""
+
+    def __init__(self):
+        self.data = {}  # key -> (value, expires_at or None)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self.data[key]
+            return None
+        return value
+
+
+def ok(text='OK'):
+    return b'+%s\r\n' % text.encode()
+
+
+def error(text):
+    return b'-ERR %s\r\n' % text.encode()
+
+
+def integer(value):
+    return b':%d\r\n' % value
+
+
+def bulk(value):
+    if value is None:
+        return b'$-1\r\n'
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+
+def execute(store, args):
+    command = args[0].upper()
+    if command == b'PING':
+        return ok('PONG')
+    if command in (b'AUTH', b'SELECT', b'FLUSHALL'):
+        if command == b'FLUSHALL':
+            store.data.clear()
+        return ok()
+    if command == b'GET':
+        return bulk(store.get(args[1]))
+    if command == b'DEL':
+        removed = sum(1 for key in args[1:] if store.data.pop(key, None) is not None)
+        return integer(removed)
+    if command == b'SET':
+        key, value = args[1], args[2]
+        options = [arg.upper() for arg in args[3:]]
+        if b'NX' in options and store.get(key) is not None:
+            return bulk(None)
+        expires_at = None
+        for unit, scale in ((b'EX', 1.0), (b'PX', 0.001)):
+            if unit in options:
+                expires_at = time.monotonic() + int(args[3 + options.index(unit) + 1]) * scale
+        store.data[key] = (value, expires_at)
+        return ok()
+    if command in (b'INCR', b'INCRBY'):
+        key = args[1]
+        amount = int(args[2]) if command == b'INCRBY' else 1
+        current = store.get(key)
+        value = int(current or 0) + amount
+        expires_at = store.data.get(key, (None, None))[1]
+        store.data[key] = (str(value).encode(), expires_at)
+        return integer(value)
+    return error(f'unknown command {command.decode()!r}')
+
+
+class Handler(socketserver.StreamRequestHandler):
+    disable_nagle_algorithm = True
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        store = self.server.store
+        queued = None
+        while True:
+            try:
+                args = self.read_command()
+            except ConnectionError:
+                return
+            if args is None:
+                return
+            command = args[0].upper()
+            if command == b'MULTI':
+                queued = []
+                reply = ok()
+            elif command == b'DISCARD':
+                queued = None
+                reply = ok()
+            elif command == b'EXEC':
+                with store.lock:
+                    results = [execute(store, queued_args) for queued_args in queued or []]
+                queued = None
+                reply = b'*%d\r\n' % len(results) + b''.join(results)
+            elif queued is not None:
+                queued.append(args)
+                reply = ok('QUEUED')
+            else:
+                with store.lock:
+                    reply = execute(store, args)
+            if self.server.delay:
+                time.sleep(self.server.delay)
+            try:
+                self.wfile.write(reply)
+            except ConnectionError:
+                return
+
+
+class StandinServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, delay=0.0):
+        super().__init__(address, Handler)
+        self.store = Store()
+        self.delay = delay
+
+
+def start(port=0, delay=0.0):
+    """Serve in a background thread and return the server"""
+    server = StandinServer(('127.0.0.1', port), delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def check():
+    from limiter import RedisRateLimiter
+
+    server = start()
+    url = f'redis://127.0.0.1:{server.server_address[1]}/0'
+    limiter = RedisRateLimiter(url, max_requests=10, window=60)
+
+    allowed = sum(limiter.hit('203.0.113.7') for _ in range(25))
+    print(f'allowed {allowed} of 25 (limit 10)')
+    assert allowed == 10, 'limit not enforced'
+
+    started = time.perf_counter()
+    for i in range(1000):
+        limiter.hit(f'198.51.100.{i % 200}')
+    per_check = (time.perf_counter() - started) / 1000 * 1000
+    print(f'{per_check:.3f} ms per check, {limiter.stats()["connectionsCreated"]} connection(s) opened')
+
+    server.delay = 0.2
+    started = time.perf_counter()
+    allowed = limiter.hit('192.0.2.1')
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f'slow store: allowed={allowed} after {elapsed:.0f} ms, stats={limiter.stats()}')
+    assert allowed and limiter.stats()['available'] is False, 'did not fail open'
+
+    started = time.perf_counter()
+    limiter.hit('192.0.2.1')
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f'during cool-down the store is skipped: {elapsed:.2f} ms')
+    server.shutdown()
+    print('OK')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=6390)
+    parser.add_argument('--delay', type=float, default=0.0)
+    parser.add_argument('--check', action='store_true')
+    args = parser.parse_args()
+    if args.check:
+        check()
+        return
+    server = StandinServer(('127.0.0.1', args.port), args.delay)
+    print(f'serving on 127.0.0.1:{args.port}')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -16,6 +16,22 @@ const ROUTE_MAP = {
   contact: '/contact#contact'
 };
 
+// One ID per browser tab, so the backend can follow up on earlier answers
+const getSessionId = () => {
+  try {
+    let sessionId = window.sessionStorage.getItem('chatSessionId');
+    if (!sessionId) {
+      sessionId = window.crypto && window.crypto.randomUUID
+        ? window.crypto.randomUUID()
+        : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+      window.sessionStorage.setItem('chatSessionId', sessionId);
+    }
+    return sessionId;
+  } catch (error) {
+    return undefined;
+  }
+};
+
 const Chatbot = () => {
   const { t, i18n } = useTranslation();
   const navigate = useNavigate();
@@ -220,7 +236,11 @@ const Chatbot = () => {
     return text.length <= 500 && text.trim().length > 0;
   };
 
-  const sendMessage = async (messageText) => {
+  // Pre-prompts go out as GET so the browser and any CDN can reuse the
+  // answer; the session header only records it, so a typed follow-up such
+  // as "tell me more" still knows what came before. Typed messages are
+  // POSTed with the session, whose earlier turns may shape the answer
+  const sendMessage = async (messageText, { cacheable = false } = {}) => {
     if (!messageText.trim()) return;
 
     // Validate and sanitize input
@@ -242,19 +262,26 @@ const Chatbot = () => {
     let lastError = null;
     for (const url of apiCandidates) {
       try {
-        const response = await axios.post(
-          url,
-          {
-            message: sanitizedMessage,
-            language: i18n.language
-          },
-          {
-            timeout: 10000,
-            headers: {
-              'Content-Type': 'application/json'
-            }
-          }
-        );
+        const response = cacheable
+          ? await axios.get(url, {
+              params: { message: sanitizedMessage, language: i18n.language },
+              timeout: 10000,
+              headers: { 'X-Session-Id': getSessionId() }
+            })
+          : await axios.post(
+              url,
+              {
+                message: sanitizedMessage,
+                language: i18n.language,
+                sessionId: getSessionId()
+              },
+              {
+                timeout: 10000,
+                headers: {
+                  'Content-Type': 'application/json'
+                }
+              }
+            );
 
         const normalizedText = normalizeResponseLinks(response.data.response || '');
         const botMessage = {
@@ -318,7 +345,7 @@ const Chatbot = () => {
   };
 
   const handlePreQuestionClick = (question) => {
-    sendMessage(question);
+    sendMessage(question, { cacheable: true });
   };
 
   const handleLinkClick = useCallback((e) => {